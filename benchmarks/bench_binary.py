@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Round-trip check and benchmark of tokenized MSX basic output
+
+    Converts randomized songs with randomized options to ASCII MSX basic, tokenizes them
+    by lcutils.msxbas and fails unless detokenize() gives the same lines back,
+    then measures the tokenization of a long synthetic song.
+
+   Constraints:
+    * Songs are kept small enough for MSX memory, because tokenize() rejects larger programs.
+
+    Examples:
+        python benchmarks/bench_binary.py --songs 300 --bars 64
+"""
+
+import os
+import sys
+import random
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lcutils import Basic
+from lcutils.msxbas import tokenize
+from lcutils.msxbas import detokenize
+from synthsong import make_song
+from synthsong import dumps_song
+
+def generate(lctext, **config):
+    """Convert LC jsonl text into MSX basic lines
+
+    Returns:
+        list[str]: MSX basic lines
+    """
+    mb = Basic()
+    mb.configure(**config)
+    mb.loads(lctext)
+    return mb.generate()
+
+def check(songs, seed):
+    """Round-trip check over randomized songs and options
+
+    Returns:
+        int: Number of mismatches
+    """
+    rnd = random.Random(seed)
+    mismatches = 0
+    for i in range(songs):
+        config = dict(start=rnd.randint(0, 1000), \
+            step=rnd.randint(1, 100), \
+            notelen=rnd.choice((8, 16, 32)), \
+            extend=rnd.random() < 0.5, \
+            nmacro=rnd.random() < 0.5, \
+            couple=rnd.random() < 0.5, \
+            pack=rnd.random() < 0.5, \
+            dedup=rnd.random() < 0.5, \
+            optimize=rnd.random() < 0.5)
+        lctext = dumps_song(make_song(bars=rnd.randint(1, 16), \
+            play_notes=rnd.randint(1, 48), \
+            seed=rnd.random(), \
+            absent=rnd.choice((0.0, 0.1, 0.5)), \
+            noise=rnd.choice((None, 0.0, 0.2))))
+        lines = generate(lctext, **config)
+        if detokenize(tokenize(lines)) != lines:
+            print('MISMATCH song {0} {1}'.format(i, config))
+            mismatches += 1
+    return mismatches
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--songs', default=300, help='set number of randomized songs for round-trip check', type=int)
+    ap.add_argument('--seed', default=0, help='set random seed', type=int)
+    ap.add_argument('--bars', default=64, help='set number of bars of the benchmark song', type=int)
+    ap.add_argument('--repeat', default=3, help='set number of repetitions', type=int)
+    args = ap.parse_args()
+
+    mismatches = check(args.songs, args.seed)
+    print('round-trip check    : {0} / {1} songs identical'.format(args.songs - mismatches, args.songs))
+
+    lines = generate(dumps_song(make_song(bars=args.bars, play_notes=16)))
+    data = tokenize(lines)
+    print('lines               : {0} ({1} bytes ASCII, {2} bytes tokenized)'.format(len(lines), \
+        sum(len(line) for line in lines), len(data)))
+    t = min(timeit.repeat(lambda: tokenize(lines), number=1, repeat=args.repeat))
+    print('tokenize  per line  : {0:.1f} us'.format(t / len(lines) * 1e6))
+    t = min(timeit.repeat(lambda: detokenize(data), number=1, repeat=args.repeat))
+    print('detokenize per line : {0:.1f} us'.format(t / len(lines) * 1e6))
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Differential check and benchmark of conversion engines
+
+    Converts randomized songs by both 'python' and 'numpy' engines and fails unless
+    the channel strings and the mixer value are byte-identical, then measures both
+    engines on a long synthetic song.
+
+    Examples:
+        python benchmarks/bench_engines.py --songs 200 --bars 2048
+"""
+
+import os
+import sys
+import random
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lcutils import Basic
+from lcutils import LCVALS
+from synthsong import make_song
+
+def convert(lcsong, engine, **config):
+    """Convert the song by the engine
+
+    Returns:
+        tuple: channel strings and mixer value
+    """
+    mb = Basic()
+    mb.configure(engine=engine, **config)
+    mb.lc2mml(lcsong)
+    return mb.notes, mb._mixer
+
+def check(songs, seed):
+    """Differential check over randomized songs
+
+    Returns:
+        int: Number of mismatches
+    """
+    rnd = random.Random(seed)
+    mismatches = 0
+    for i in range(songs):
+        lcsong = make_song(bars=rnd.randint(1, 16), \
+            play_notes=rnd.randint(1, 32), \
+            seed=rnd.random(), \
+            absent=rnd.choice((0.0, 0.1, 0.5)))
+        #Notes out of LC range take the fallback path of both engines
+        for channel in lcsong[LCVALS.CH.value][LCVALS.CH.value]:
+            for bar in channel[LCVALS.SL.value]:
+                for note in bar[LCVALS.VL.value]:
+                    if note[LCVALS.N.value] is not None and rnd.random() < 0.01:
+                        note[LCVALS.N.value] = rnd.randint(LCVALS.MAXNUM.value+1, 200)
+        config = dict(notelen=rnd.choice((8, 16, 32)), nmacro=rnd.random() < 0.5)
+        if convert(lcsong, 'python', **config) != convert(lcsong, 'numpy', **config):
+            print('MISMATCH song {0} {1}'.format(i, config))
+            mismatches += 1
+    return mismatches
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--songs', default=200, help='set number of randomized songs for differential check', type=int)
+    ap.add_argument('--seed', default=0, help='set random seed', type=int)
+    ap.add_argument('--bars', default=2048, help='set number of bars of the benchmark song', type=int)
+    ap.add_argument('--repeat', default=3, help='set number of repetitions', type=int)
+    args = ap.parse_args()
+
+    mismatches = check(args.songs, args.seed)
+    print('differential check  : {0} / {1} songs identical'.format(args.songs - mismatches, args.songs))
+
+    mb = Basic()
+    mb.lc2mml(make_song(bars=args.bars))
+    notes = mb.song.numnotes()
+    print('play notes          : {0}'.format(notes))
+    for engine in ('python', 'numpy'):
+        mb.configure(engine=engine)
+        t = min(timeit.repeat(lambda: mb.lc2mml(), number=1, repeat=args.repeat))
+        print('{0:<7}    per note : {1:.1f} ns'.format(engine, t / notes * 1e9))
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Import-time benchmark of the console command
+
+    Runs lc2msxmml.py by 'python -X importtime' for the usage and for single conversion,
+    and reports the total import time and wall time of the cold start.
+    It fails when GUI toolkit or other heavy modules are imported by the console command,
+    or when the time regresses against the saved baseline beyond the tolerance.
+
+    Examples:
+        python benchmarks/bench_import.py --save
+        python benchmarks/bench_import.py --tolerance 0.3
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from synthsong import write_song
+
+SCRIPT = os.path.join(ROOT, 'lc2msxmml.py')
+FORBIDDEN = ('dearpygui', 'lcgui', 'numpy', 'concurrent.futures', 'multiprocessing')
+
+def run(args, stdin=''):
+    """Run the console command with import time report
+
+    Args:
+        args (list[str]): Arguments of lc2msxmml.py
+        stdin (str): Standard input text
+
+    Returns:
+        tuple: wall time in seconds, total import time in microseconds and imported module names
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', SCRIPT] + args, \
+        input=stdin, capture_output=True, text=True, cwd=ROOT)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+
+    total = 0
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        modules.append(name.strip())
+        #Only top level imports are summed because cumulative time contains nested ones
+        if not name[1:].startswith(' '):
+            total += int(cumulative)
+    return wall, total, modules
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--repeat', default=5, help='set number of runs, the fastest one is taken', type=int)
+    ap.add_argument('--baseline', default=os.path.join(ROOT, 'benchmarks', 'import_baseline.json'), help='set baseline file', type=str)
+    ap.add_argument('--save', help='save the result as the baseline', action='store_true')
+    ap.add_argument('--tolerance', default=0.2, help='set allowed ratio of regression (default[0.2])', type=float)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lcfile = os.path.join(tmp, 'song.jsonl')
+        write_song(lcfile, bars=8)
+        cases = {
+            'usage': (['-h'], ''),
+            'convert': ([os.path.join(tmp, 'song.bas')], lcfile + '\n'),
+            }
+
+        result = {}
+        failed = False
+        for case, (cmd, stdin) in cases.items():
+            runs = [run(cmd, stdin) for i in range(args.repeat)]
+            wall = min(r[0] for r in runs)
+            total = min(r[1] for r in runs)
+            heavy = sorted(set(m for m in runs[0][2] for f in FORBIDDEN if m == f or m.startswith(f + '.')))
+            result[case] = {'wall': wall, 'import': total}
+            print('{0:<8}: wall {1:.1f} ms, import {2:.1f} ms'.format(case, wall * 1e3, total / 1e3))
+            if heavy:
+                print('  FAIL heavy modules imported: {0}'.format(', '.join(heavy)))
+                failed = True
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print('Saved baseline to {0}'.format(args.baseline))
+    elif os.path.isfile(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for case, values in result.items():
+            for key, value in values.items():
+                base = baseline.get(case, {}).get(key)
+                if base and value > base * (1 + args.tolerance):
+                    print('  FAIL {0} {1} regressed {2:.1f}% against baseline'.format(case, key, (value / base - 1) * 100))
+                    failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
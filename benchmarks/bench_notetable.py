@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Micro-benchmark of the note lookup table
+
+    Compares per-note cost of Basic.num2macro by the lookup table against the plain
+    calculation by Basic.calcmacro, and measures Basic.lc2mml on a large synthetic song.
+
+    Examples:
+        python benchmarks/bench_notetable.py --bars 512
+"""
+
+import os
+import sys
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lcutils import Basic
+from lcutils import LCVALS
+from synthsong import make_song
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--bars', default=512, help='set number of bars of the synthetic song', type=int)
+    ap.add_argument('--repeat', default=5, help='set number of repetitions', type=int)
+    args = ap.parse_args()
+
+    mb = Basic()
+    song = make_song(bars=args.bars)
+    nums = [note[LCVALS.N.value] \
+        for channel in song[LCVALS.CH.value][LCVALS.CH.value] \
+        for bar in channel[LCVALS.SL.value] \
+        for note in bar[LCVALS.VL.value]]
+
+    def calculated():
+        for num in nums:
+            Basic.calcmacro(num, 16, False)
+
+    def looked_up():
+        for num in nums:
+            mb.num2macro(num)
+
+    calc = min(timeit.repeat(calculated, number=1, repeat=args.repeat))
+    table = min(timeit.repeat(looked_up, number=1, repeat=args.repeat))
+    conv = min(timeit.repeat(lambda: mb.lc2mml(song), number=1, repeat=args.repeat))
+
+    print('notes               : {0}'.format(len(nums)))
+    print('calcmacro  per note : {0:.1f} ns'.format(calc / len(nums) * 1e9))
+    print('num2macro  per note : {0:.1f} ns ({1:.2f}x)'.format(table / len(nums) * 1e9, calc / table))
+    print('lc2mml     per note : {0:.1f} ns'.format(conv / len(nums) * 1e9))
+
+if __name__ == '__main__':
+    main()
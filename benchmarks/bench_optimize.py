@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Playback check and benchmark of size-optimal encoding
+
+    Converts randomized songs with and without the optimization, plays both programs
+    by the model of MSX 'PLAY' below and fails unless every channel plays the same pitches
+    for the same durations, then measures the optimization of a long synthetic song.
+
+   Constraints:
+    * The model follows MSX, 'N1' is 'O1C' and 'N0' is the rest, independently of the converter tables.
+    * Consecutive rests are merged before the comparison, because coupling may join them differently.
+
+    Examples:
+        python benchmarks/bench_optimize.py --songs 200 --bars 1024
+"""
+
+import os
+import re
+import sys
+import random
+import argparse
+import timeit
+from fractions import Fraction
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lcutils import Basic
+from lcutils.reverse import Reader
+from synthsong import make_song
+from synthsong import dumps_song
+
+_NOTE = re.compile(r'([A-G])([+#-]?)(\d*)(\.*)|R(\d*)(\.*)|N(\d+)|([OL])(\d+)|([<>])|[TVMS]\d*')
+_SCALEINDEX = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+
+class Player(Reader):
+    """Model of MSX 'PLAY' collecting pitch and duration by the channel
+    """
+    def __init__(self):
+        super().__init__()
+        self.octaves = [4] * 3
+        self.lengths = [4] * 3
+        self.channels = [[], [], []]
+
+    def add(self, channel, pitch, length, dots):
+        """Append single note, merging consecutive rests
+        """
+        notes = self.channels[channel]
+        duration = Fraction(1, length) * (2 - Fraction(1, 2 ** len(dots)))
+        if pitch is None and notes and notes[-1][0] is None:
+            notes[-1] = (None, notes[-1][1] + duration)
+        else:
+            notes.append((pitch, duration))
+
+    def play(self, args):
+        """Play single 'PLAY' statement
+        """
+        for c, mml in enumerate(args):
+            pos = 0
+            for m in _NOTE.finditer(mml):
+                if m.start() != pos:
+                    break
+                pos = m.end()
+                scale, accidental, notelen, dots, restlen, restdots, number, macro, value, shift = m.groups()
+                if scale is not None:
+                    pitch = (self.octaves[c] - 1) * 12 + _SCALEINDEX[scale] + \
+                        (1 if accidental in ('+', '#') else -1 if accidental == '-' else 0)
+                    self.add(c, pitch, int(notelen) if notelen else self.lengths[c], dots)
+                elif restdots is not None:
+                    self.add(c, None, int(restlen) if restlen else self.lengths[c], restdots)
+                elif number is not None:
+                    self.add(c, int(number) - 1 if int(number) else None, self.lengths[c], '')
+                elif macro == 'O':
+                    self.octaves[c] = int(value)
+                elif macro == 'L':
+                    self.lengths[c] = int(value)
+                elif shift is not None:
+                    self.octaves[c] += 1 if shift == '>' else -1
+            if pos != len(mml):
+                raise ValueError('Unsupported notation at \'{0}\''.format(mml[pos:]))
+
+def playback(lctext, **config):
+    """Convert LC jsonl text and play the program by the model
+
+    Returns:
+        list[list[tuple]]: Pitch and duration by the note of each channel
+    """
+    mb = Basic()
+    mb.configure(**config)
+    mb.loads(lctext)
+    player = Player()
+    for line in mb.generate():
+        player.line(line)
+    return player.channels
+
+def check(songs, seed):
+    """Playback check over randomized songs and options
+
+    Returns:
+        int: Number of mismatches
+    """
+    rnd = random.Random(seed)
+    mismatches = 0
+    for i in range(songs):
+        config = dict(notelen=rnd.choice((8, 16, 32)), \
+            nmacro=rnd.random() < 0.5, \
+            extend=rnd.random() < 0.5, \
+            couple=rnd.random() < 0.5, \
+            pack=rnd.random() < 0.5, \
+            dedup=rnd.random() < 0.5)
+        lctext = dumps_song(make_song(bars=rnd.randint(1, 16), \
+            play_notes=rnd.randint(1, 48), \
+            seed=rnd.random(), \
+            absent=rnd.choice((0.0, 0.1, 0.5)), \
+            octaves=rnd.randint(1, 7)))
+        if playback(lctext, **config) != playback(lctext, optimize=True, **config):
+            print('MISMATCH song {0} {1}'.format(i, config))
+            mismatches += 1
+    return mismatches
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--songs', default=200, help='set number of randomized songs for playback check', type=int)
+    ap.add_argument('--seed', default=0, help='set random seed', type=int)
+    ap.add_argument('--bars', default=1024, help='set number of bars of the benchmark song', type=int)
+    ap.add_argument('--repeat', default=3, help='set number of repetitions', type=int)
+    args = ap.parse_args()
+
+    mismatches = check(args.songs, args.seed)
+    print('playback check      : {0} / {1} songs identical'.format(args.songs - mismatches, args.songs))
+
+    mb = Basic()
+    mb.loads(dumps_song(make_song(bars=args.bars)))
+    notes = mb.song.numnotes()
+    print('play notes          : {0}'.format(notes))
+    for optimize in (False, True):
+        mb.configure(optimize=optimize)
+        t = min(timeit.repeat(lambda: mb.generate(), number=1, repeat=args.repeat))
+        print('optimize {0:<5} bytes : {1} ({2:.1f} ns per note)'.format(str(optimize), \
+            sum(len(line) for line in mb.mml), t / notes * 1e9))
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Round-trip check and benchmark of the reverse converter
+
+    Converts randomized songs to MSX basic, back to LC jsonl by lcutils.reverse and to MSX basic again,
+    and fails unless both MSX basic programs are identical, then measures the reverse conversion
+    of a long synthetic song.
+
+   Constraints:
+    * Packed and coupled songs have every step voiced, because a rest coupled over the steps
+      without LC voice does not keep their positions, and the line may be filled differently.
+
+    Examples:
+        python benchmarks/bench_reverse.py --songs 200 --bars 2048
+"""
+
+import io
+import os
+import sys
+import random
+import argparse
+import tempfile
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lcutils import Basic
+from lcutils.reverse import bas2lc
+from synthsong import make_song
+from synthsong import dumps_song
+
+def generate(lctext, **config):
+    """Convert LC jsonl text into MSX basic lines
+
+    Returns:
+        list[str]: MSX basic lines
+    """
+    mb = Basic()
+    mb.configure(**config)
+    mb.loads(lctext)
+    return mb.generate()
+
+def reverse(lines):
+    """Convert MSX basic lines back into LC jsonl text
+
+    Returns:
+        tuple: LC jsonl text and the conversion parameters found
+    """
+    out = io.StringIO()
+    settings = bas2lc(io.StringIO(''.join(lines)), out)
+    return out.getvalue(), settings
+
+def check(songs, seed):
+    """Round-trip check over randomized songs and options
+
+    Returns:
+        int: Number of mismatches
+    """
+    rnd = random.Random(seed)
+    mismatches = 0
+    for i in range(songs):
+        config = dict(notelen=rnd.choice((8, 16, 32)), \
+            tempo=rnd.randint(32, 255), \
+            volume=rnd.randint(0, 15), \
+            extend=rnd.random() < 0.5, \
+            nmacro=rnd.random() < 0.5, \
+            couple=rnd.random() < 0.5, \
+            pack=rnd.random() < 0.5, \
+            dedup=rnd.random() < 0.5, \
+            optimize=rnd.random() < 0.5)
+        lctext = dumps_song(make_song(bars=rnd.randint(1, 16), \
+            play_notes=rnd.randint(1, 48), \
+            seed=rnd.random(), \
+            absent=0.0 if config['pack'] and config['couple'] else rnd.choice((0.0, 0.1, 0.5)), \
+            noise=rnd.choice((None, 0.0, 0.2))))
+        lines = generate(lctext, **config)
+        reversed_text, settings = reverse(lines)
+        found = dict((key, config[key]) for key in settings)
+        if generate(reversed_text, **config) != lines or settings != found:
+            print('MISMATCH song {0} {1}'.format(i, config))
+            mismatches += 1
+    return mismatches
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--songs', default=200, help='set number of randomized songs for round-trip check', type=int)
+    ap.add_argument('--seed', default=0, help='set random seed', type=int)
+    ap.add_argument('--bars', default=2048, help='set number of bars of the benchmark song', type=int)
+    ap.add_argument('--repeat', default=3, help='set number of repetitions', type=int)
+    args = ap.parse_args()
+
+    mismatches = check(args.songs, args.seed)
+    print('round-trip check    : {0} / {1} songs identical'.format(args.songs - mismatches, args.songs))
+
+    lines = generate(dumps_song(make_song(bars=args.bars)))
+    notes = args.bars * 32 * 3
+    print('play notes          : {0} in {1} lines'.format(notes, len(lines)))
+    t = min(timeit.repeat(lambda: reverse(lines), number=1, repeat=args.repeat))
+    print('reverse   per note  : {0:.1f} ns'.format(t / notes * 1e9))
+    #Files are streamed, so that the peak stays bounded regardless of the song length
+    with tempfile.TemporaryFile('w+', encoding='ascii') as f_in, open(os.devnull, 'w', encoding='utf-8') as f_out:
+        f_in.writelines(lines)
+        f_in.seek(0)
+        tracemalloc.start()
+        bas2lc(f_in, f_out)
+        print('reverse   peak      : {0:.1f} KiB'.format(tracemalloc.get_traced_memory()[1] / 1024))
+        tracemalloc.stop()
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
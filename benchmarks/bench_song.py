@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the compact song representation
+
+    Compares resident memory of the jsonl dictionary tree against lcutils.Song,
+    and measures building and conversion time on a large synthetic song.
+
+    Examples:
+        python benchmarks/bench_song.py --bars 1024 --play-notes 16
+"""
+
+import os
+import sys
+import gc
+import json
+import argparse
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lcutils import Basic
+from lcutils import Song
+from synthsong import make_song
+
+def allocated(build):
+    """Memory retained by the built object
+
+    Args:
+        build: callable returning the object to be measured
+
+    Returns:
+        tuple: retained bytes and the built object
+    """
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, obj
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--bars', default=1024, help='set number of bars of the synthetic song', type=int)
+    ap.add_argument('--play-notes', default=16, help='set number of play notes per single bar', type=int)
+    ap.add_argument('--repeat', default=5, help='set number of repetitions', type=int)
+    args = ap.parse_args()
+
+    text = json.dumps(make_song(bars=args.bars, play_notes=args.play_notes))
+
+    tree, lcsong = allocated(lambda: json.loads(text))
+    compact, song = allocated(lambda: Song.from_dict(json.loads(text)))
+
+    build = min(timeit.repeat(lambda: Song.from_dict(lcsong), number=1, repeat=args.repeat))
+    mb = Basic()
+    mb.song = song
+    conv = min(timeit.repeat(lambda: mb.lc2mml(), number=1, repeat=args.repeat))
+    notes = song.numnotes()
+
+    print('play notes          : {0}'.format(notes))
+    print('dictionary tree     : {0:.1f} KiB'.format(tree / 1024))
+    print('Song                : {0:.1f} KiB ({1:.1f}x smaller)'.format(compact / 1024, tree / compact))
+    print('Song.from_dict      : {0:.1f} ms'.format(build * 1e3))
+    print('lc2mml     per note : {0:.1f} ns'.format(conv / notes * 1e9))
+
+if __name__ == '__main__':
+    main()
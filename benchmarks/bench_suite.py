@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark suite of the conversion stages across song sizes
+
+    Measures Basic.read(), Basic.lc2mml(), Basic.generate() and the end-to-end console command
+    on synthetic LC jsonl files, and reports notes per second and peak traced memory.
+    The result can be saved as the baseline, and it fails when the time regresses
+    against the saved baseline beyond the tolerance.
+
+    Examples:
+        python benchmarks/bench_suite.py --save
+        python benchmarks/bench_suite.py --sizes 64 512 --noise 0.1 --octaves 3
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import timeit
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from lcutils import Basic
+from synthsong import write_song
+
+SCRIPT = os.path.join(ROOT, 'lc2msxmml.py')
+
+def peak(run):
+    """Peak traced memory during single run
+
+    Args:
+        run: callable to be measured
+
+    Returns:
+        int: Peak traced bytes
+    """
+    tracemalloc.start()
+    run()
+    size = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size
+
+def cli(lcfile, basfile):
+    """Single conversion by the console command
+
+    Args:
+        lcfile (str): The path of LovelyComposer source file
+        basfile (str): The path of target MSX basic file
+    """
+    subprocess.run([sys.executable, SCRIPT, basfile], input=lcfile + '\n', \
+        capture_output=True, text=True, cwd=ROOT, check=True)
+
+def measure(lcfile, basfile, notes, repeat):
+    """Measure all stages on single song
+
+    Args:
+        lcfile (str): The path of LovelyComposer source file
+        basfile (str): The path of target MSX basic file
+        notes (int): Number of play notes of the song
+        repeat (int): Number of runs, the fastest one is taken
+
+    Returns:
+        dict: time, notes per second and peak memory by the stage
+    """
+    mb = Basic()
+    mb.read(lcfile)
+    stages = {
+        'read': lambda: Basic().read(lcfile),
+        'lc2mml': lambda: mb.lc2mml(),
+        'generate': lambda: mb.generate(),
+        'cli': lambda: cli(lcfile, basfile),
+        }
+
+    result = {}
+    for stage, run in stages.items():
+        elapsed = min(timeit.repeat(run, number=1, repeat=repeat))
+        #Memory of the child process is not traced
+        memory = peak(run) if stage != 'cli' else None
+        result[stage] = {'time': elapsed, 'notes_per_sec': notes / elapsed, 'peak': memory}
+    return result
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sizes', nargs='+', default=[16, 128, 1024], help='set numbers of bars of synthetic songs', type=int)
+    ap.add_argument('--play-notes', default=32, help='set number of play notes per single bar', type=int)
+    ap.add_argument('--noise', help='set ratio of noise voices', type=float)
+    ap.add_argument('--octaves', default=7, help='set number of octaves the notes spread over', type=int)
+    ap.add_argument('--repeat', default=5, help='set number of runs, the fastest one is taken', type=int)
+    ap.add_argument('--baseline', default=os.path.join(ROOT, 'benchmarks', 'suite_baseline.json'), help='set baseline file', type=str)
+    ap.add_argument('--save', help='save the result as the baseline', action='store_true')
+    ap.add_argument('--tolerance', default=0.2, help='set allowed ratio of regression (default[0.2])', type=float)
+    args = ap.parse_args()
+
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for bars in args.sizes:
+            lcfile = os.path.join(tmp, 'song{0}.jsonl'.format(bars))
+            notes = write_song(lcfile, bars=bars, play_notes=args.play_notes, noise=args.noise, octaves=args.octaves)
+            case = '{0}x{1}'.format(bars, args.play_notes)
+            result[case] = measure(lcfile, os.path.join(tmp, 'song.bas'), notes, args.repeat)
+            print('{0} bars ({1} notes)'.format(bars, notes))
+            for stage, values in result[case].items():
+                print('  {0:<9}: {1:9.2f} ms {2:12.0f} notes/s  peak {3}'.format(stage, values['time'] * 1e3, \
+                    values['notes_per_sec'], '-' if values['peak'] is None else '{0:.1f} KiB'.format(values['peak'] / 1024)))
+
+    failed = False
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print('Saved baseline to {0}'.format(args.baseline))
+    elif os.path.isfile(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for case, stages in result.items():
+            for stage, values in stages.items():
+                base = baseline.get(case, {}).get(stage, {}).get('time')
+                if base and values['time'] > base * (1 + args.tolerance):
+                    print('  FAIL {0} {1} regressed {2:.1f}% against baseline'.format(case, stage, (values['time'] / base - 1) * 100))
+                    failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
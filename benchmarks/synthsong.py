@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Synthetic LovelyComposer song for benchmarks
+
+    Builds the song dictionary in the same structure as LC jsonl except of its header line,
+    and writes it as LC jsonl file with the header line.
+
+    Examples:
+        python benchmarks/synthsong.py --bars 256 --noise 0.1 --octaves 3 song.jsonl
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lcutils import LCVALS
+from lcutils import MSXVALS
+
+HEADER = 'LovelyComposer synthetic song'
+TONEIDS = (1, 2, 5)
+LEGACYIDS = (1, 2, 3, 5, 7)
+
+def make_song(bars=64, play_notes=32, seed=0, slots=32, absent=0.0, noise=None, octaves=7):
+    """Make random LovelyComposer song dictionary
+
+    Args:
+        bars (int): Number of bars by the channel
+        play_notes (int): Number of play notes per single bar
+        seed (int): Random seed
+        slots (int): Number of voice list entries per single bar beyond play notes
+        absent (float): Ratio of play notes without LC voice
+        noise (float): Ratio of noise voices (LCVALS.NOISEID) among the notes
+            (None: uniform choice from tone and noise IDs)
+        octaves (int): Number of octaves the notes spread over around the center (1-7)
+
+    Returns:
+        dict: LC song data dictionary except of jsonl header context
+    """
+    rnd = random.Random(seed)
+    span = min(max(octaves, 1), 7) * 12
+    low = LCVALS.MINNUM.value + (LCVALS.MAXNUM.value - LCVALS.MINNUM.value + 1 - span) // 2
+    channels = []
+    for c in range(MSXVALS.CHANNELS.value):
+        sl = []
+        for b in range(bars):
+            vl = []
+            for n in range(max(play_notes, slots)):
+                if n < play_notes and rnd.random() < absent:
+                    vl.append({LCVALS.LCVO.value: None, LCVALS.ID.value: None, LCVALS.N.value: None})
+                elif n >= play_notes or rnd.random() < 0.25:
+                    vl.append({LCVALS.LCVO.value: True, LCVALS.ID.value: None, LCVALS.N.value: None})
+                else:
+                    if noise is None:
+                        tone = rnd.choice(LEGACYIDS)
+                    elif rnd.random() < noise:
+                        tone = rnd.choice(LCVALS.NOISEID.value)
+                    else:
+                        tone = rnd.choice(TONEIDS)
+                    vl.append({LCVALS.LCVO.value: True, \
+                        LCVALS.ID.value: tone, \
+                        LCVALS.N.value: rnd.randint(low, low + span - 1)})
+            sl.append({LCVALS.PN.value: play_notes, LCVALS.VL.value: vl})
+        channels.append({LCVALS.SL.value: sl})
+    return {LCVALS.CH.value: {LCVALS.CH.value: channels}}
+
+def dumps_song(lcsong):
+    """LC jsonl text of the song
+
+    Args:
+        lcsong (dict): LC song data dictionary made by make_song()
+
+    Returns:
+        str: The header line and the song in JSON
+    """
+    return HEADER + '\n' + json.dumps(lcsong)
+
+def write_song(path, **params):
+    """Write random LovelyComposer song as LC jsonl file
+
+    Args:
+        path (str): The path of LC jsonl file
+        params: Keyword arguments for make_song()
+
+    Returns:
+        int: Number of play notes of all channels
+    """
+    lcsong = make_song(**params)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(dumps_song(lcsong))
+    return params.get('bars', 64) * params.get('play_notes', 32) * MSXVALS.CHANNELS.value
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('lcfile', help='set LovelyComposer music file name to be written', type=str)
+    ap.add_argument('--bars', default=64, help='set number of bars (default[64])', type=int)
+    ap.add_argument('--play-notes', default=32, help='set number of play notes per single bar (default[32])', type=int)
+    ap.add_argument('--seed', default=0, help='set random seed (default[0])', type=int)
+    ap.add_argument('--absent', default=0.0, help='set ratio of play notes without LC voice (default[0.0])', type=float)
+    ap.add_argument('--noise', help='set ratio of noise voices (default: uniform over tone and noise IDs)', type=float)
+    ap.add_argument('--octaves', default=7, help='set number of octaves the notes spread over (1-7: default[7])', type=int)
+    args = ap.parse_args()
+
+    notes = write_song(args.lcfile, bars=args.bars, play_notes=args.play_notes, seed=args.seed, \
+        absent=args.absent, noise=args.noise, octaves=args.octaves)
+    print('Wrote {0} play notes to {1}'.format(notes, args.lcfile))
+
+if __name__ == '__main__':
+    main()
@@ -21,234 +21,425 @@
 import os
 import sys
 import argparse
-import dearpygui.dearpygui as dpg
 from lcutils import Basic
 from lcutils import MSXVALS as mv
 
-mb = Basic()
-
-def jsonl_callback(sender, app_data):
-    """Callback function serving for jsonl selector
+def show_window():
+    """Show grafical user interface window by importing GUI module on demand
 
     Args:
-        sender: caller dearpygui object
-        app_data: dearpygui file_diaglog app_data
+        None
 
     Returns:
         None
     """
-    global mb
-    if os.path.isfile(app_data['file_path_name']):
-        dpg.set_value('jsonl', app_data['file_path_name'])
-        dpg.configure_item('convert', enabled=True)
+    import lcgui
+    lcgui.show_window()
+
+
+def measure(mb, config, **changes):
+    """Measure the conversion result without keeping it
+
+    Args:
+        mb (Basic): Basic instance whose song has been read
+        config (dict): Keyword arguments for Basic.configure()
+        changes: Keyword arguments overriding config
+
+    Returns:
+        tuple[int]: Number of lines and bytes
+    """
+    mb.configure(**dict(config, **changes))
+    lines = 0
+    size = 0
+    for mml in mb.iter_lines():
+        lines += 1
+        size += len(mml)
+    return lines, size
+
+
+def open_cache(args):
+    """Open the conversion cache designated by console arguments
+
+    Args:
+        args: parsed console arguments
+
+    Returns:
+        Cache: Conversion cache, or None when the cache is disabled
+    """
+    if not args.cache or args.no_cache:
+        return None
+    from lcutils.cache import Cache
+    return Cache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+
+def remote_convert(args, config, lcfile, address):
+    """Convert single LovelyComposer file by the conversion daemon
+
+    Args:
+        args: parsed console arguments
+        config (dict): Keyword arguments for Basic.configure()
+        lcfile (str): The path of LovelyComposer source file
+        address (str): Daemon address as 'HOST:PORT'
+
+    Returns:
+        bool: True if converted or rejected by the daemon, False if the daemon is not reachable
+    """
+    from lcutils import server
+
+    with open(lcfile, 'r', encoding='utf-8') as f:
+        lctext = f.read()
+    try:
+        data = server.request(lctext, config, args.format == 'binary', address)
+    except OSError:
+        return False
+    except ValueError as e:
+        print('Conversion rejected by the daemon at {0}: {1}'.format(address, e))
+        return True
+    if args.format == 'binary':
+        with open(args.basfile, 'wb') as f_out:
+            f_out.write(data)
     else:
-        dpg.configure_item('convert', enabled=False)
-    dpg.set_value('result', 'Opened {0}'.format(app_data['file_name']))
-    mb.read(app_data['file_path_name'])
+        with open(args.basfile, 'w', encoding='ascii') as f_out:
+            f_out.write(data.decode('ascii'))
+    return True
 
 
-def gen_callback(sender, app_data):
-    """Callback function serving for conversion kicker
+def report_profile(args, profile):
+    """Report per-stage time and counters as designated by console arguments
 
     Args:
-        sender: caller dearpygui object
-        app_data: dearpygui button child app_data
+        args: parsed console arguments
+        profile (Profile): Profile of the conversion
 
     Returns:
         None
     """
-    global mb
-    mb.configure(start = dpg.get_value('startline'), \
-        step = dpg.get_value('step'), \
-        notelen = dpg.get_value('notelen'), \
-        tempo = dpg.get_value('tempo'), \
-        volume = dpg.get_value('volume'), \
-        extend = dpg.get_value('extend'), \
-        nmacro = dpg.get_value('nmacro'), \
-        )
-    song = mb.generate()
-    dpg.set_value('status', ''.join(song))
-    dpg.set_value('result', 'Conversion finished')
-
-
-def bas_callback(sender, app_data):
-    """Callback function serving for bas selector
+    if args.profile:
+        print('\n'.join(profile.report()))
+    if args.stats_json:
+        import json
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(profile.asdict(), f, indent=2)
+
+
+def targets_convert(args, config, lcfile):
+    """Convert single LovelyComposer file into several targets by single pass
+
+        Each target is written to the file whose name is the MSX bas file name suffixed by the target.
 
     Args:
-        sender: caller dearpygui object
-        app_data: dearpygui file_diaglog app_data
+        args: parsed console arguments
+        config (dict): Keyword arguments for Basic.configure()
+        lcfile (str): The path of LovelyComposer source file
 
     Returns:
         None
     """
-    if not os.path.isdir(app_data['file_path_name']):
-        dpg.set_value('bas', app_data['file_path_name'])
-        song =  dpg.get_value('status').strip()
-        with open(app_data['file_path_name'], 'w', encoding='ascii') as f_out:
-            f_out.write(song)
-            dpg.set_value('result', 'Saved {0}'.format(app_data['file_name']))
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    for target in targets:
+        if target not in mv.TARGETS.value:
+            print('Unknown target given as \'{0}\' (choose from {1})'.format(target, ','.join(mv.TARGETS.value)))
+            return
+
+    mb = Basic()
+    mb.configure(**config)
+    profile = mb.instrument() if args.profile or args.stats_json else None
+    mb.read(lcfile)
+    results = mb.generate_targets(targets)
+
+    root, ext = os.path.splitext(args.basfile)
+    for target, lines in results.items():
+        basfile = '{0}_{1}{2}'.format(root, target, ext)
+        if args.format == 'binary':
+            from lcutils.msxbas import write
+            with open(basfile, 'wb') as f_out:
+                write(f_out, lines)
+        else:
+            with open(basfile, 'w', encoding='ascii') as f_out:
+                f_out.write(''.join(lines))
+        print('{0:<7}: {1} lines -> {2}'.format(target, len(lines), basfile))
 
+    if profile is not None:
+        report_profile(args, profile)
 
-def resource_path(relative):
-    """Return the resource path which PyInstaller temporarily reserves.
+
+def batch_convert(args, config, cache):
+    """Convert the directory or the glob pattern of LovelyComposer files by the process pool
 
     Args:
-        relative (str): The resource file name with designated directory path.
+        args: parsed console arguments
+        config (dict): Keyword arguments for Basic.configure()
+        cache (Cache): Conversion cache (None: not used)
 
     Returns:
-        Resource file path.
+        int: Number of failed files
     """
-    if hasattr(sys, '_MEIPASS'):
-        return os.path.join(sys._MEIPASS, relative)
-    return os.path.join(os.path.abspath('.'), relative)
+    from lcutils import batch
+
+    lcfiles = batch.collect(args.batch)
+    if not any(lcfiles):
+        print('No LovelyComposer file found by \'{0}\'.'.format(args.batch))
+        return 0
+    if os.path.isfile(args.out_dir):
+        print('The output directory given as {0}. is file'.format(args.out_dir))
+        return 1
+
+    results = batch.run(lcfiles, args.out_dir, config, jobs=args.jobs, cache=cache, binary=args.format == 'binary')
+
+    failed = 0
+    for lcfile, basfile, error in results:
+        if error is None:
+            print('OK   {0} -> {1}'.format(lcfile, basfile))
+        else:
+            print('FAIL {0}: {1}'.format(lcfile, error))
+            failed += 1
+    print('Converted {0} / {1} files ({2} failed)'.format(len(results)-failed, len(results), failed))
+    return failed
 
 
-def show_window():
-    """Show grafical user interface window for lc2mmxmml
+def watch(args, config):
+    """Convert changed LovelyComposer files of the directory until interrupted
 
-        This function shall be called mutually exclusive with standard input.
+    Args:
+        args: parsed console arguments
+        config (dict): Keyword arguments for Basic.configure()
+
+    Returns:
+        None
+    """
+    from lcutils.watch import Watcher
+
+    def report(lcfile, basfile, error, elapsed):
+        if error is None:
+            print('OK   {0} -> {1} ({2:.1f} ms)'.format(lcfile, basfile, elapsed * 1e3), flush=True)
+        else:
+            print('FAIL {0}: {1}'.format(lcfile, error), flush=True)
+
+    if not os.path.isdir(args.watch):
+        print('The watched directory given as {0}. is not directory'.format(args.watch))
+        return
+    print('Watching {0} (Ctrl+C to stop)'.format(args.watch), flush=True)
+    try:
+        Watcher(args.watch, args.out_dir, config, args.format == 'binary').run(args.interval, report)
+    except KeyboardInterrupt:
+        pass
+
+
+def reverse_convert(args, basfile):
+    """Convert single ASCII MSX basic file back into LovelyComposer jsonl
 
     Args:
+        args: parsed console arguments, basfile argument is the target LovelyComposer file
+        basfile (str): The path of ASCII MSX basic source file
+
+    Returns:
         None
+    """
+    from lcutils.reverse import bas2lc
+
+    try:
+        with open(basfile, 'r', encoding='ascii', errors='replace') as f_in, \
+            open(args.basfile, 'w', encoding='utf-8') as f_out:
+            settings = bas2lc(f_in, f_out, args.notelen)
+    except ValueError as e:
+        print('Unsupported MSX basic {0}: {1}'.format(basfile, e))
+        return
+    print('Reversed {0} -> {1}'.format(basfile, args.basfile))
+    print('notelen {notelen}, tempo {tempo}, volume {volume}, extend {extend}'.format(**settings))
+
+
+def preview_render(args, config, lcfile):
+    """Render PSG preview of single LovelyComposer file into WAV file
+
+    Args:
+        args: parsed console arguments
+        config (dict): Keyword arguments for Basic.configure()
+        lcfile (str): The path of LovelyComposer source file
 
     Returns:
         None
     """
-    dpg.create_context()
-    dpg.create_viewport(title='lc2msxmml', width=800, height=600)
-    dpg.setup_dearpygui()
-
-    with dpg.file_dialog( \
-        label='Select LovelyComposer jsonl File', \
-        directory_selector=False, \
-        show=False, \
-        callback=jsonl_callback, \
-        file_count=1, \
-        tag="jsonl_dialog_tag", \
-        width=600, \
-        height=400):
-        dpg.add_file_extension(".jsonl", color=(0, 255, 0))
-
-    with dpg.file_dialog( \
-        label='Designate msx basic File', \
-        default_filename='', \
-        directory_selector=False, \
-        show=False, \
-        callback=bas_callback, \
-        file_count=1, \
-        tag="bas_dialog_tag", \
-        width=600, \
-        height=400):
-        dpg.add_file_extension(".bas", color=(0, 255, 0))
-
-    with dpg.theme() as global_theme:
-
-        with dpg.theme_component(dpg.mvChildWindow):
-            dpg.add_theme_color(dpg.mvThemeCol_ChildBg, [60, 60, 255])
-            dpg.add_theme_color(dpg.mvThemeCol_TitleBg, [60, 60, 255])
-            dpg.add_theme_color(dpg.mvThemeCol_CheckMark, [255, 160, 60])
-            dpg.add_theme_style(dpg.mvStyleVar_FrameRounding, 5, category=dpg.mvThemeCat_Core)
-            dpg.add_theme_style(dpg.mvStyleVar_ChildRounding, 5, category=dpg.mvThemeCat_Core)
-
-        with dpg.theme_component(dpg.mvInputText):
-            dpg.add_theme_color(dpg.mvThemeCol_FrameBg, [0, 0, 255])
-            dpg.add_theme_style(dpg.mvStyleVar_FrameRounding, 5, category=dpg.mvThemeCat_Core)
-
-        with dpg.theme_component(dpg.mvButton, enabled_state=True):
-            dpg.add_theme_color(dpg.mvThemeCol_Text, [0, 0, 0])
-            dpg.add_theme_color(dpg.mvThemeCol_Button, [0, 255, 155])
-
-        with dpg.theme_component(dpg.mvButton, enabled_state=False):
-            dpg.add_theme_color(dpg.mvThemeCol_Text, [0, 0, 0])
-            dpg.add_theme_color(dpg.mvThemeCol_Button, [50, 50, 50])
-
-    with dpg.window(label="lc2msxmml_window", tag='primary'):
-        with dpg.group(horizontal=False, width=0):
-            with dpg.child_window(width=770, height=36):
-                with dpg.group(horizontal=True):
-                    dpg.add_button(label="SELECT .jsonl", callback=lambda: dpg.show_item("jsonl_dialog_tag"), width=150, height=18)
-                    dpg.add_input_text(default_value = '', readonly=True, tag='jsonl', width=595)
-            with dpg.group(horizontal=True, width=0):
-                with dpg.child_window(width=220, height=465):
-                    dpg.add_input_int(label=' START LINE', default_value=mv.DEFLINE.value, tag='startline', width=85, \
-                        min_value=1, min_clamped=True, max_value=1000, max_clamped=True, step_fast=10)
-                    dpg.add_input_int(label=' STEP', default_value=mv.DEFSTEP.value, tag='step', width=85, \
-                        min_value=1, min_clamped=True, max_value=1000, max_clamped=True, step_fast=10)
-                    dpg.add_input_int(label=' NOTE LENGTH', default_value=mv.DEFLEN.value, tag='notelen', width=85, \
-                        min_value=1, min_clamped=True, max_value=64, max_clamped=True, step_fast=5)
-                    dpg.add_input_int(label=' TEMPO', default_value=mv.DEFTEMPO.value, tag='tempo', width=85, \
-                        min_value=32, min_clamped=True, max_value=255, max_clamped=True, step_fast=10)
-                    dpg.add_input_int(label=' VOLUME', default_value=mv.DEFVOLUME.value, tag='volume', width=85, \
-                        min_value=0, min_clamped=True, max_value=15, max_clamped=True)
-                    dpg.add_checkbox(label=' Use extended BASIC PLAY', tag='extend')
-                    dpg.add_checkbox(label=' Use BASIC mml \'N\' macro', tag='nmacro')
-                    dpg.add_button(enabled=False, label="CONVERT", callback=gen_callback, width = 150, height = 20, tag='convert')
-                    dpg.add_text('', tag='result', color=[255, 160, 60])
-                    dpg.add_loading_indicator(show=False, tag='indicator', color=[200,0,200,255], secondary_color=[30,200,200,100])
-                dpg.add_input_text(tag='status', multiline=True, tracked=True, width=540, height=465)
-            with dpg.child_window(width=770, height=36):
-                with dpg.group(horizontal=True):
-                    dpg.add_button(label="SAVE", callback=lambda: dpg.show_item("bas_dialog_tag"), width=150, height=18)
-                    dpg.add_input_text(default_value = '', readonly=True, tag='bas', width=595)
-
-    dpg.bind_theme(global_theme)
-
-    dpg.set_viewport_small_icon(resource_path('lc2msxmml_small.ico'))
-    dpg.set_viewport_large_icon(resource_path('lc2msxmml.ico'))
-
-    dpg.show_viewport()
-    dpg.set_primary_window('primary', True)
-    dpg.start_dearpygui()
-    dpg.destroy_context()
+    import time
+    from lcutils import preview
+
+    if not preview.available():
+        print('NumPy is required for the preview')
+        return
+    mb = Basic()
+    mb.configure(**config)
+    mb.read(lcfile)
+    start = time.perf_counter()
+    seconds = preview.write(args.preview, mb)
+    elapsed = time.perf_counter() - start
+    print('Rendered {0:.1f} s preview in {1:.2f} s -> {2}'.format(seconds, elapsed, args.preview))
+
+
+def timing_report(args, config, lcfile):
+    """Report MSX playback timing of the conversion
+
+        ASCII MSX basic file given as the source is analyzed as is.
+
+    Args:
+        args: parsed console arguments
+        config (dict): Keyword arguments for Basic.configure()
+        lcfile (str): The path of LovelyComposer source file or ASCII MSX basic file
+
+    Returns:
+        None
+    """
+    from lcutils.batch import BASEXT
+    from lcutils.timing import analyze
+
+    try:
+        if lcfile.lower().endswith(BASEXT):
+            with open(lcfile, 'r', encoding='ascii', errors='replace') as f_in:
+                analyzer = analyze(f_in)
+        else:
+            mb = Basic()
+            mb.configure(**config)
+            mb.read(lcfile)
+            analyzer = analyze(mb.iter_lines())
+    except ValueError as e:
+        print('Unsupported MSX basic {0}: {1}'.format(lcfile, e))
+        return
+    print('\n'.join(analyzer.report()))
 
 
 '''
     From here start main operation.
 '''
-if sys.stdin != None:
-
-    ap = argparse.ArgumentParser()
-
-    if sys.stdin.isatty():
-        ap.add_argument('lcfile', nargs='?', default='', help='set LovelyComposer music file name', type=str)
-    ap.add_argument('basfile', nargs='?', default='', help='set target file name', type=str)
-    ap.add_argument('-s','--start', help='set start line number for target file (1-: default[{0}])'.format(mv.DEFLINE.value), type=int)
-    ap.add_argument('-p','--step', help='set number of line steps for target file (1-: default[{0}])'.format(mv.DEFSTEP.value), type=int)
-    ap.add_argument('-l','--notelen', help='set number of note length for target file (1-64: default[{0}])'.format(mv.DEFLEN.value), type=int)
-    ap.add_argument('-t','--tempo', help='set mml tempo (32-255: default[{0}])'.format(mv.DEFTEMPO.value), type=int)
-    ap.add_argument('-v','--volume', help='set mml volume (0-15: default[{0}])'.format(mv.DEFVOLUME.value), type=int)
-    ap.add_argument('-e','--extend', help='use extended basic', action='store_true')
-    ap.add_argument('-n','--nmacro', help='use msx basic mml \'N\' macro')
-
-    args = ap.parse_args()
-
-    lcfile = args.lcfile if hasattr(args, 'lcfile') else input().strip()
-    basfile = args.basfile
-
-    if any(lcfile):
-        if not os.path.isfile(lcfile):
-            print('Invalid LovelyComposer file name given as \'{0}\'.'.format(lcfile))
-        elif basfile == '':
-            print('The MSX bas file given as empty')
-        elif os.path.isdir(args.basfile):
-            print('The MSX bas file given as {0}. is directory'.format(args.basfile))
+if __name__ == '__main__':
+
+    #Frozen binary spawns batch workers by itself
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+
+    if sys.stdin != None:
+
+        ap = argparse.ArgumentParser()
+
+        if sys.stdin.isatty():
+            ap.add_argument('lcfile', nargs='?', default='', help='set LovelyComposer music file name', type=str)
+        ap.add_argument('basfile', nargs='?', default='', help='set target file name', type=str)
+        ap.add_argument('-s','--start', help='set start line number for target file (1-: default[{0}])'.format(mv.DEFLINE.value), type=int)
+        ap.add_argument('-p','--step', help='set number of line steps for target file (1-: default[{0}])'.format(mv.DEFSTEP.value), type=int)
+        ap.add_argument('-l','--notelen', help='set number of note length for target file (1-64: default[{0}])'.format(mv.DEFLEN.value), type=int)
+        ap.add_argument('-t','--tempo', help='set mml tempo (32-255: default[{0}])'.format(mv.DEFTEMPO.value), type=int)
+        ap.add_argument('-v','--volume', help='set mml volume (0-15: default[{0}])'.format(mv.DEFVOLUME.value), type=int)
+        ap.add_argument('-e','--extend', help='use extended basic', action='store_true')
+        ap.add_argument('-n','--nmacro', help='use msx basic mml \'N\' macro')
+        ap.add_argument('-c','--couple', help='couple consecutive rests into shortest length notation', action='store_true')
+        ap.add_argument('-k','--pack', help='fill each line up to msx basic line length instead of 8 notes', action='store_true')
+        ap.add_argument('-d','--dedup', help='share repeated mml strings by string variables', action='store_true')
+        ap.add_argument('-z','--optimize', help='re-encode octaves and default lengths into the shortest notation', action='store_true')
+        ap.add_argument('--engine', default=mv.DEFENGINE.value, choices=mv.ENGINES.value, help='set conversion engine (numpy engine requires NumPy: default[{0}])'.format(mv.DEFENGINE.value))
+        ap.add_argument('--targets', metavar='TARGETS', help='convert into several targets at once by comma separated list of {0}, written to the files suffixed by the target'.format(','.join(mv.TARGETS.value)), type=str)
+        ap.add_argument('-f','--format', default='ascii', choices=('ascii', 'binary'), help='set target file format, ascii text or tokenized binary basic (default[ascii])')
+        ap.add_argument('-b','--batch', help='convert all LovelyComposer files in the directory or matching the glob pattern', type=str)
+        ap.add_argument('-o','--out-dir', default='.', help='set target directory for batch and watch conversion (default[.])', type=str)
+        ap.add_argument('-j','--jobs', help='set number of worker processes for batch conversion (default[number of CPUs])', type=int)
+        ap.add_argument('--cache', help='use conversion cache', action='store_true')
+        ap.add_argument('--no-cache', help='do not use conversion cache (overrides --cache)', action='store_true')
+        ap.add_argument('--clear-cache', help='remove all entries of conversion cache', action='store_true')
+        ap.add_argument('--cache-dir', help='set conversion cache directory', type=str)
+        ap.add_argument('--cache-size', default=64, help='set size cap of conversion cache in MB (default[64])', type=int)
+        ap.add_argument('--profile', help='report time by the stage (read, lc2mml, generate, write) and counters of single conversion', action='store_true')
+        ap.add_argument('--stats-json', metavar='FILE', help='write per-stage time and counters of single conversion to JSON file', type=str)
+        ap.add_argument('-w','--watch', metavar='DIR', help='convert LovelyComposer files in the directory whenever they change', type=str)
+        ap.add_argument('--interval', default=0.5, help='set polling interval of watch mode in seconds (default[0.5])', type=float)
+        ap.add_argument('--timing', help='report MSX playback timing of the conversion instead of writing target file, ASCII MSX basic source is analyzed as is', action='store_true')
+        ap.add_argument('--preview', metavar='WAV', help='render PSG preview of the conversion into WAV file instead of target file (requires NumPy)', type=str)
+        ap.add_argument('-r','--reverse', help='convert ASCII MSX basic file back into LovelyComposer file given as target file name', action='store_true')
+        ap.add_argument('--serve', nargs='?', const='', metavar='ADDRESS', help='run conversion daemon on localhost HTTP at HOST:PORT (default[127.0.0.1:8765])', type=str)
+        ap.add_argument('--server', default=os.environ.get('LC2MSXMML_SERVER'), metavar='ADDRESS', help='convert by the daemon at HOST:PORT, locally if not reachable (default[$LC2MSXMML_SERVER])', type=str)
+
+        args = ap.parse_args()
+
+        config = dict(start = args.start if args.start else mv.DEFLINE.value, \
+            step = args.step if args.step else mv.DEFSTEP.value, \
+            notelen = args.notelen if args.notelen else mv.DEFLEN.value, \
+            tempo = args.tempo if args.tempo else mv.DEFTEMPO.value, \
+            volume = args.volume if args.volume else mv.DEFVOLUME.value, \
+            extend = args.extend, \
+            nmacro = args.nmacro, \
+            engine = args.engine, \
+            couple = args.couple, \
+            pack = args.pack, \
+            dedup = args.dedup, \
+            optimize = args.optimize)
+
+        cache = open_cache(args)
+        if args.clear_cache:
+            from lcutils.cache import Cache
+            print('Removed {0} cache entries'.format(Cache(args.cache_dir).clear()))
+            if not (args.batch or getattr(args, 'lcfile', '') or args.basfile):
+                sys.exit(0)
+
+        if args.serve is not None:
+            from lcutils import server
+            try:
+                server.serve(args.serve, args.jobs, \
+                    lambda address: print('Serving on {0}:{1}'.format(*address), flush=True))
+            except KeyboardInterrupt:
+                pass
+            sys.exit(0)
+
+        if args.batch:
+            sys.exit(1 if batch_convert(args, config, cache) else 0)
+
+        if args.watch:
+            watch(args, config)
+            sys.exit(0)
+
+        lcfile = args.lcfile if hasattr(args, 'lcfile') else input().strip()
+        basfile = args.basfile
+
+        if any(lcfile):
+            if not os.path.isfile(lcfile):
+                print('Invalid LovelyComposer file name given as \'{0}\'.'.format(lcfile))
+            elif args.timing:
+                timing_report(args, config, lcfile)
+            elif args.preview:
+                preview_render(args, config, lcfile)
+            elif basfile == '':
+                print('The MSX bas file given as empty')
+            elif os.path.isdir(args.basfile):
+                print('The MSX bas file given as {0}. is directory'.format(args.basfile))
+            elif args.reverse:
+                reverse_convert(args, lcfile)
+            elif args.targets:
+                targets_convert(args, config, lcfile)
+            elif args.server and remote_convert(args, config, lcfile, args.server):
+                pass
+            else:
+                from lcutils.batch import write_file
+                mb = Basic()
+                mb.configure(**config)
+                profile = mb.instrument() if args.profile or args.stats_json else None
+                hit = write_file(mb, lcfile, args.basfile, cache, args.format == 'binary')
+
+                if profile is not None:
+                    report_profile(args, profile)
+
+                if not hit:
+                    saved = mb.savedbytes
+                    references, strings = mb.dedupcount
+                    variables = len(mb.dedupnames)
+                    if args.couple:
+                        print('Coupling saved {0} bytes'.format(saved))
+                    if args.optimize:
+                        print('Optimizing saved {0} bytes'.format(mb.optimizedbytes))
+                    if args.pack:
+                        print('Packing {0} lines / {1} bytes -> {2} lines / {3} bytes'.format( \
+                            *(measure(mb, config, pack=False) + measure(mb, config))))
+                    if args.dedup:
+                        print('Dedup {0} / {1} strings by {2} variables (ratio {3:.2f}), {4} bytes -> {5} bytes'.format( \
+                            references, strings, variables, references / strings if strings else 0, \
+                            measure(mb, config, dedup=False)[1], measure(mb, config)[1]))
+
         else:
-            with open(args.basfile, 'w', encoding='ascii') as f_out:
-                mb.configure(start = args.start if args.start else mv.DEFLINE.value, \
-                    step = args.step if args.step else mv.DEFSTEP.value, \
-                    notelen = args.notelen if args.notelen else mv.DEFLEN.value, \
-                    tempo = args.tempo if args.tempo else mv.DEFTEMPO.value, \
-                    volume = args.volume if args.volume else mv.DEFVOLUME.value, \
-                    extend = args.extend, \
-                    nmacro = args.nmacro)
-                mb.read(lcfile)
-                song = mb.generate()
-
-                for mml in song:
-                    f_out.write(mml)
+            show_window()
 
     else:
         show_window()
-
-else:
-    show_window()
\ No newline at end of file
@@ -0,0 +1,471 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Graphical user interface for lc2msxmml
+
+    The window and its callbacks of the converter from LovelyComposer jsonl to MSX basic mml.
+    This module is imported only when the window is shown, so that the console command
+    does not load GUI toolkit.
+
+    Examples:
+        python lc2msxmml.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import dearpygui.dearpygui as dpg
+from lcutils import Basic
+from lcutils import MSXVALS as mv
+
+#Number of lines converted between progress reports
+PROGRESSLINES = 32
+#WAV file of the preview in the temporary directory, and player commands tried in order
+PREVIEWFILE = 'lc2msxmml_preview.wav'
+PLAYERS = (('afplay',), ('aplay', '-q'), ('paplay',), ('ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet'))
+
+#Song read by the latest file selection, and the running background job
+song = None
+job = None
+lock = threading.Lock()
+
+class Job:
+    """Reading or conversion running on the worker thread
+
+        Constraints
+            * Each job works on its own Basic instance, and the read song is shared read-only.
+            * The job finishes only if it is still the current one, so that a replaced job
+              never overwrites the window or the read song.
+    """
+    def __init__(self, target, *args):
+        """Initialization
+
+        Args:
+            target: Worker function called with this job and args
+            args: Arguments of the worker function
+        """
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=target, args=(self,) + args, daemon=True)
+
+    def cancel(self):
+        """Request the worker to stop at the next check
+        """
+        self.cancelled.set()
+
+    def progress(self, message):
+        """Report progress unless the job is replaced
+
+        Args:
+            message (str): Progress shown in the result text
+        """
+        with lock:
+            if job is self:
+                dpg.set_value('result', message)
+
+    def finish(self, message, apply=None):
+        """Show the result and release the window unless the job is replaced
+
+        Args:
+            message (str): Result shown in the result text
+            apply: Function called under the lock to reflect the result (None: nothing)
+
+        Returns:
+            bool: True if the job was still the current one
+        """
+        global job
+        with lock:
+            if job is not self:
+                return False
+            job = None
+            if apply is not None:
+                apply()
+            dpg.hide_item('indicator')
+            dpg.configure_item('cancel', enabled=False)
+            dpg.configure_item('convert', enabled=song is not None)
+            dpg.configure_item('preview', enabled=song is not None)
+            dpg.set_value('result', message)
+        return True
+
+
+def start_job(target, *args):
+    """Cancel the running job and start the new one on the worker thread
+
+    Args:
+        target: Worker function called with the job and args
+        args: Arguments of the worker function
+
+    Returns:
+        None
+    """
+    global job
+    with lock:
+        if job is not None:
+            job.cancel()
+        job = Job(target, *args)
+        current = job
+        dpg.show_item('indicator')
+        dpg.configure_item('cancel', enabled=True)
+        dpg.configure_item('convert', enabled=False)
+        dpg.configure_item('preview', enabled=False)
+    current.thread.start()
+
+
+def read_worker(current, lcfile, name):
+    """Worker reading LovelyComposer file
+
+    Args:
+        current (Job): The job of this worker
+        lcfile (str): The path of LovelyComposer source file
+        name (str): The file name shown in the window
+
+    Returns:
+        None
+    """
+    def apply():
+        global song
+        song = mb.song
+
+    mb = Basic()
+    try:
+        mb.read(lcfile)
+    except Exception as e:
+        current.finish('Failed to open {0}: {1}'.format(name, e))
+        return
+    if current.cancelled.is_set():
+        current.finish('Opening {0} cancelled'.format(name))
+        return
+    current.finish('Opened {0}'.format(name), apply)
+
+
+def convert_worker(current, config, read):
+    """Worker converting the read song
+
+        The progress is reported by the number of converted lines.
+
+    Args:
+        current (Job): The job of this worker
+        config (dict): Keyword arguments for Basic.configure()
+        read (Song): The read song
+
+    Returns:
+        None
+    """
+    def apply():
+        dpg.set_value('status', ''.join(lines))
+
+    mb = Basic()
+    mb.song = read
+    lines = []
+    try:
+        mb.configure(**config)
+        for line in mb.iter_lines():
+            if current.cancelled.is_set():
+                current.finish('Conversion cancelled')
+                return
+            lines.append(line)
+            if len(lines) % PROGRESSLINES == 0:
+                current.progress('Converting {0} lines'.format(len(lines)))
+    except Exception as e:
+        current.finish('Conversion failed: {0}'.format(e))
+        return
+    current.finish('Conversion finished', apply)
+
+
+def play(wavfile):
+    """Play WAV file without blocking the window
+
+        Windows plays by winsound, and other systems by the player command found on the path.
+
+    Args:
+        wavfile (str): The path of WAV file
+
+    Returns:
+        bool: True if playing started
+    """
+    try:
+        import winsound
+    except ImportError:
+        winsound = None
+    if winsound is not None:
+        winsound.PlaySound(wavfile, winsound.SND_FILENAME | winsound.SND_ASYNC)
+        return True
+
+    import shutil
+    import subprocess
+    for player in PLAYERS:
+        if shutil.which(player[0]):
+            subprocess.Popen(list(player) + [wavfile], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+    return False
+
+
+def preview_worker(current, config, read):
+    """Worker rendering and playing PSG preview of the read song
+
+    Args:
+        current (Job): The job of this worker
+        config (dict): Keyword arguments for Basic.configure()
+        read (Song): The read song
+
+    Returns:
+        None
+    """
+    from lcutils import preview
+
+    if not preview.available():
+        current.finish('NumPy is required for the preview')
+        return
+    wavfile = os.path.join(tempfile.gettempdir(), PREVIEWFILE)
+    mb = Basic()
+    mb.song = read
+    try:
+        mb.configure(**config)
+        seconds = preview.write(wavfile, mb)
+    except Exception as e:
+        current.finish('Preview failed: {0}'.format(e))
+        return
+    if current.cancelled.is_set():
+        current.finish('Preview cancelled')
+        return
+    if play(wavfile):
+        current.finish('Playing {0:.1f} s preview'.format(seconds))
+    else:
+        current.finish('Saved preview to {0}'.format(wavfile))
+
+
+def jsonl_callback(sender, app_data):
+    """Callback function serving for jsonl selector
+
+        Reading runs on the worker thread and replaces the running job.
+
+    Args:
+        sender: caller dearpygui object
+        app_data: dearpygui file_diaglog app_data
+
+    Returns:
+        None
+    """
+    global song
+    if os.path.isfile(app_data['file_path_name']):
+        dpg.set_value('jsonl', app_data['file_path_name'])
+        with lock:
+            song = None
+        dpg.set_value('result', 'Opening {0}'.format(app_data['file_name']))
+        start_job(read_worker, app_data['file_path_name'], app_data['file_name'])
+    else:
+        dpg.configure_item('convert', enabled=False)
+        dpg.configure_item('preview', enabled=False)
+        dpg.set_value('result', 'Opened {0}'.format(app_data['file_name']))
+
+
+def options():
+    """Conversion options set in the window
+
+    Returns:
+        dict: Keyword arguments for Basic.configure()
+    """
+    return dict(start = dpg.get_value('startline'), \
+        step = dpg.get_value('step'), \
+        notelen = dpg.get_value('notelen'), \
+        tempo = dpg.get_value('tempo'), \
+        volume = dpg.get_value('volume'), \
+        extend = dpg.get_value('extend'), \
+        nmacro = dpg.get_value('nmacro'), \
+        couple = dpg.get_value('couple'), \
+        pack = dpg.get_value('pack'), \
+        dedup = dpg.get_value('dedup'), \
+        optimize = dpg.get_value('optimize'), \
+        )
+
+
+def gen_callback(sender, app_data):
+    """Callback function serving for conversion kicker
+
+        Conversion runs on the worker thread and replaces the running job.
+
+    Args:
+        sender: caller dearpygui object
+        app_data: dearpygui button child app_data
+
+    Returns:
+        None
+    """
+    with lock:
+        read = song
+    if read is None:
+        return
+    dpg.set_value('result', 'Converting')
+    start_job(convert_worker, options(), read)
+
+
+def preview_callback(sender, app_data):
+    """Callback function serving for preview button
+
+        Rendering runs on the worker thread and replaces the running job.
+
+    Args:
+        sender: caller dearpygui object
+        app_data: dearpygui button child app_data
+
+    Returns:
+        None
+    """
+    with lock:
+        read = song
+    if read is None:
+        return
+    dpg.set_value('result', 'Rendering preview')
+    start_job(preview_worker, options(), read)
+
+
+def cancel_callback(sender, app_data):
+    """Callback function serving for cancel button
+
+    Args:
+        sender: caller dearpygui object
+        app_data: dearpygui button child app_data
+
+    Returns:
+        None
+    """
+    with lock:
+        if job is not None:
+            job.cancel()
+
+
+def bas_callback(sender, app_data):
+    """Callback function serving for bas selector
+
+    Args:
+        sender: caller dearpygui object
+        app_data: dearpygui file_diaglog app_data
+
+    Returns:
+        None
+    """
+    if not os.path.isdir(app_data['file_path_name']):
+        dpg.set_value('bas', app_data['file_path_name'])
+        song =  dpg.get_value('status').strip()
+        with open(app_data['file_path_name'], 'w', encoding='ascii') as f_out:
+            f_out.write(song)
+            dpg.set_value('result', 'Saved {0}'.format(app_data['file_name']))
+
+
+def resource_path(relative):
+    """Return the resource path which PyInstaller temporarily reserves.
+
+    Args:
+        relative (str): The resource file name with designated directory path.
+
+    Returns:
+        Resource file path.
+    """
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, relative)
+    return os.path.join(os.path.abspath('.'), relative)
+
+
+def show_window():
+    """Show grafical user interface window for lc2mmxmml
+
+        This function shall be called mutually exclusive with standard input.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    dpg.create_context()
+    dpg.create_viewport(title='lc2msxmml', width=800, height=600)
+    dpg.setup_dearpygui()
+
+    with dpg.file_dialog( \
+        label='Select LovelyComposer jsonl File', \
+        directory_selector=False, \
+        show=False, \
+        callback=jsonl_callback, \
+        file_count=1, \
+        tag="jsonl_dialog_tag", \
+        width=600, \
+        height=400):
+        dpg.add_file_extension(".jsonl", color=(0, 255, 0))
+
+    with dpg.file_dialog( \
+        label='Designate msx basic File', \
+        default_filename='', \
+        directory_selector=False, \
+        show=False, \
+        callback=bas_callback, \
+        file_count=1, \
+        tag="bas_dialog_tag", \
+        width=600, \
+        height=400):
+        dpg.add_file_extension(".bas", color=(0, 255, 0))
+
+    with dpg.theme() as global_theme:
+
+        with dpg.theme_component(dpg.mvChildWindow):
+            dpg.add_theme_color(dpg.mvThemeCol_ChildBg, [60, 60, 255])
+            dpg.add_theme_color(dpg.mvThemeCol_TitleBg, [60, 60, 255])
+            dpg.add_theme_color(dpg.mvThemeCol_CheckMark, [255, 160, 60])
+            dpg.add_theme_style(dpg.mvStyleVar_FrameRounding, 5, category=dpg.mvThemeCat_Core)
+            dpg.add_theme_style(dpg.mvStyleVar_ChildRounding, 5, category=dpg.mvThemeCat_Core)
+
+        with dpg.theme_component(dpg.mvInputText):
+            dpg.add_theme_color(dpg.mvThemeCol_FrameBg, [0, 0, 255])
+            dpg.add_theme_style(dpg.mvStyleVar_FrameRounding, 5, category=dpg.mvThemeCat_Core)
+
+        with dpg.theme_component(dpg.mvButton, enabled_state=True):
+            dpg.add_theme_color(dpg.mvThemeCol_Text, [0, 0, 0])
+            dpg.add_theme_color(dpg.mvThemeCol_Button, [0, 255, 155])
+
+        with dpg.theme_component(dpg.mvButton, enabled_state=False):
+            dpg.add_theme_color(dpg.mvThemeCol_Text, [0, 0, 0])
+            dpg.add_theme_color(dpg.mvThemeCol_Button, [50, 50, 50])
+
+    with dpg.window(label="lc2msxmml_window", tag='primary'):
+        with dpg.group(horizontal=False, width=0):
+            with dpg.child_window(width=770, height=36):
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label="SELECT .jsonl", callback=lambda: dpg.show_item("jsonl_dialog_tag"), width=150, height=18)
+                    dpg.add_input_text(default_value = '', readonly=True, tag='jsonl', width=595)
+            with dpg.group(horizontal=True, width=0):
+                with dpg.child_window(width=220, height=465):
+                    dpg.add_input_int(label=' START LINE', default_value=mv.DEFLINE.value, tag='startline', width=85, \
+                        min_value=1, min_clamped=True, max_value=1000, max_clamped=True, step_fast=10)
+                    dpg.add_input_int(label=' STEP', default_value=mv.DEFSTEP.value, tag='step', width=85, \
+                        min_value=1, min_clamped=True, max_value=1000, max_clamped=True, step_fast=10)
+                    dpg.add_input_int(label=' NOTE LENGTH', default_value=mv.DEFLEN.value, tag='notelen', width=85, \
+                        min_value=1, min_clamped=True, max_value=64, max_clamped=True, step_fast=5)
+                    dpg.add_input_int(label=' TEMPO', default_value=mv.DEFTEMPO.value, tag='tempo', width=85, \
+                        min_value=32, min_clamped=True, max_value=255, max_clamped=True, step_fast=10)
+                    dpg.add_input_int(label=' VOLUME', default_value=mv.DEFVOLUME.value, tag='volume', width=85, \
+                        min_value=0, min_clamped=True, max_value=15, max_clamped=True)
+                    dpg.add_checkbox(label=' Use extended BASIC PLAY', tag='extend')
+                    dpg.add_checkbox(label=' Use BASIC mml \'N\' macro', tag='nmacro')
+                    dpg.add_checkbox(label=' Couple consecutive rests', tag='couple')
+                    dpg.add_checkbox(label=' Pack notes up to line length', tag='pack')
+                    dpg.add_checkbox(label=' Share repeated strings', tag='dedup')
+                    dpg.add_checkbox(label=' Optimize octave and length', tag='optimize')
+                    dpg.add_button(enabled=False, label="CONVERT", callback=gen_callback, width = 150, height = 20, tag='convert')
+                    dpg.add_button(enabled=False, label="PREVIEW", callback=preview_callback, width = 150, height = 20, tag='preview')
+                    dpg.add_button(enabled=False, label="CANCEL", callback=cancel_callback, width = 150, height = 20, tag='cancel')
+                    dpg.add_text('', tag='result', color=[255, 160, 60])
+                    dpg.add_loading_indicator(show=False, tag='indicator', color=[200,0,200,255], secondary_color=[30,200,200,100])
+                dpg.add_input_text(tag='status', multiline=True, tracked=True, width=540, height=465)
+            with dpg.child_window(width=770, height=36):
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label="SAVE", callback=lambda: dpg.show_item("bas_dialog_tag"), width=150, height=18)
+                    dpg.add_input_text(default_value = '', readonly=True, tag='bas', width=595)
+
+    dpg.bind_theme(global_theme)
+
+    dpg.set_viewport_small_icon(resource_path('lc2msxmml_small.ico'))
+    dpg.set_viewport_large_icon(resource_path('lc2msxmml.ico'))
+
+    dpg.show_viewport()
+    dpg.set_primary_window('primary', True)
+    dpg.start_dearpygui()
+    dpg.destroy_context()
@@ -1,12 +1,24 @@
 """ public lcutils """
+__version__ = '0.5.5'
+
 __all__ = [
     'MMLVALS',
     'LCVALS',
     'MSXVALS',
     'Basic',
+    'Song',
+    'Options',
+    'Stats',
+    'Result',
+    'convert',
     ]
 
 from .msxmml import MMLVALS
 from .msxmml import LCVALS
 from .msxmml import MSXVALS
-from .msxmml import Basic
\ No newline at end of file
+from .msxmml import Basic
+from .msxmml import Song
+from .msxmml import Options
+from .msxmml import Stats
+from .msxmml import Result
+from .msxmml import convert
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""MSX mml batch conversion module
+
+    Converts many LovelyComposer jsonl files by the process pool.
+    Each worker process owns its own Basic instance, and the failure of single file
+    does not abort the others.
+    Target files are replaced only by the complete conversion results,
+    and the files whose target names clash with the former ones are reported as failed.
+"""
+
+import io
+import os
+import glob
+from .msxmml import Basic
+
+BASEXT = '.bas'
+LCEXT = '.jsonl'
+
+#Basic instance owned by each worker process
+_worker = None
+
+def _init_worker():
+    """Initialize the Basic instance of worker process
+    """
+    global _worker
+    _worker = Basic()
+
+def collect(source):
+    """Collect LovelyComposer files from the directory or the glob pattern
+
+    Args:
+        source (str): The directory path or the glob pattern of LovelyComposer files
+
+    Returns:
+        list[str]: Sorted LovelyComposer file paths
+    """
+    if os.path.isdir(source):
+        source = os.path.join(source, '*' + LCEXT)
+    return sorted(f for f in glob.glob(source) if os.path.isfile(f))
+
+def write_file(mb, lcfile, basfile, cache=None, binary=False):
+    """Convert single LovelyComposer file by the configured Basic instance
+
+        * The conversion is written to the temporary next to the target, which replaces the target
+          only on success, so that the failure never leaves partial or empty target file.
+
+    Args:
+        mb (Basic): Configured Basic instance
+        lcfile (str): The path of LovelyComposer source file
+        basfile (str): The path of target MSX basic file
+        cache (Cache): Conversion cache (None: not used)
+        binary (bool): Write tokenized binary basic instead of ASCII text
+
+    Returns:
+        bool: True in case of cache hit
+    """
+    hit = False
+    tmp = '{0}.{1}.tmp'.format(basfile, os.getpid())
+    try:
+        with open(tmp, 'wb' if binary else 'w', encoding=None if binary else 'ascii') as f_out:
+            #Tokenized binary basic is built from the whole text at once
+            dest = io.StringIO() if binary else f_out
+            if cache is not None:
+                from .cache import convert
+                hit = convert(mb, lcfile, dest, cache)
+            else:
+                mb.read(lcfile)
+                mb.write(dest)
+            if binary:
+                from .msxbas import write
+                with mb.profile.stage('write'):
+                    write(f_out, dest.getvalue().splitlines(True))
+        os.replace(tmp, basfile)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return hit
+
+def convert_file(lcfile, basfile, config, cache=None, binary=False):
+    """Convert single LovelyComposer file to MSX basic file
+
+    Args:
+        lcfile (str): The path of LovelyComposer source file
+        basfile (str): The path of target MSX basic file
+        config (dict): Keyword arguments for Basic.configure()
+        cache (Cache): Conversion cache (None: not used)
+        binary (bool): Write tokenized binary basic instead of ASCII text
+
+    Returns:
+        tuple: lcfile, basfile and error message (None in case of success)
+    """
+    mb = _worker if _worker is not None else Basic()
+    try:
+        #Reset the members because the instance is reused over the files
+        mb.clear()
+        mb.configure(**config)
+        write_file(mb, lcfile, basfile, cache, binary)
+    except Exception as e:
+        return lcfile, basfile, '{0}: {1}'.format(type(e).__name__, e)
+    return lcfile, basfile, None
+
+def run(lcfiles, outdir, config, jobs=None, cache=None, binary=False):
+    """Convert LovelyComposer files by the process pool
+
+    Args:
+        lcfiles (list[str]): The paths of LovelyComposer source files
+        outdir (str): The directory for target MSX basic files
+        config (dict): Keyword arguments for Basic.configure()
+        jobs (int): Number of worker processes (None: number of CPUs)
+        cache (Cache): Conversion cache shared by the workers (None: not used)
+        binary (bool): Write tokenized binary basic instead of ASCII text
+
+    Returns:
+        list[tuple]: lcfile, basfile and error message by the file in the given order
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures import as_completed
+
+    os.makedirs(outdir, exist_ok=True)
+    results = [None] * len(lcfiles)
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        futures = {}
+        #The first file of the same target name is converted, and the others are failed
+        targets = {}
+        for i, lcfile in enumerate(lcfiles):
+            name = os.path.splitext(os.path.basename(lcfile))[0] + BASEXT
+            basfile = os.path.join(outdir, name)
+            target = os.path.normcase(os.path.abspath(basfile))
+            if target in targets:
+                results[i] = (lcfile, basfile, 'Target name clashes with {0}'.format(targets[target]))
+                continue
+            targets[target] = lcfile
+            futures[pool.submit(convert_file, lcfile, basfile, config, cache, binary)] = (i, lcfile, basfile)
+
+        for future in as_completed(futures):
+            i, lcfile, basfile = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                #Worker process itself has been lost
+                results[i] = (lcfile, basfile, '{0}: {1}'.format(type(e).__name__, e))
+
+    #Each worker evicts by its own size estimate, so that the size cap is applied once more over all
+    if cache is not None:
+        cache.evict()
+    return results
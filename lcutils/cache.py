@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""MSX mml conversion cache module
+
+    Content-addressed on-disk cache of conversion results.
+    The key is the hash of LovelyComposer jsonl bytes, Basic.configure() parameters except NEUTRAL ones
+    and the converter version, so that the cache hit skips both parsing and conversion.
+    The total size of the cache directory is capped by LRU eviction on the access time.
+    The directory is scanned once by the process and then only when the running size estimate
+    goes over the size cap, so that filling the cache takes linear time.
+"""
+
+import io
+import os
+import json
+import hashlib
+from . import __version__
+
+DEFSIZE = 64 * 1024 * 1024
+ENTRYEXT = '.bas'
+#Parameters which select the implementation but not the result
+NEUTRAL = ('engine',)
+#Eviction by the store leaves this ratio of the size cap, so that the following stores do not scan
+LOWMARK = 0.75
+
+#Running size estimate by the cache directory in this process
+_estimates = {}
+
+def default_dir():
+    """Default cache directory
+
+    Returns:
+        str: XDG cache directory or ~/.cache joined with lc2msxmml
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'lc2msxmml')
+
+class Cache:
+    """Conversion result cache on the directory
+
+        Constraints
+            * An entry is single MSX basic text file named by its key.
+            * The modification time of the entry is renewed on every hit as LRU order.
+    """
+    def __init__(self, directory=None, maxsize=DEFSIZE):
+        """Initialization
+
+        Args:
+            directory (str): Cache directory (None: default_dir())
+            maxsize (int): Size cap of the cache directory in bytes
+        """
+        self.directory = directory if directory else default_dir()
+        self.maxsize = maxsize
+
+    def key(self, lcdata, settings):
+        """Cache key of the conversion
+
+        Args:
+            lcdata (bytes): The whole content of LovelyComposer source file
+            settings (dict): Conversion parameters given by Basic.settings(), NEUTRAL ones are ignored
+
+        Returns:
+            str: Hex digest as the cache key
+        """
+        h = hashlib.sha256()
+        h.update(__version__.encode('ascii'))
+        settings = dict((k, v) for k, v in settings.items() if k not in NEUTRAL)
+        h.update(json.dumps(settings, sort_keys=True).encode('ascii'))
+        h.update(lcdata)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRYEXT)
+
+    def get(self, key):
+        """Look up the conversion result
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            str: MSX basic text, or None in case of miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='ascii', newline='') as f:
+                text = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return text
+
+    def put(self, key, text):
+        """Store the conversion result and evict old entries over the size cap
+
+            * The size is added to the running estimate, and the directory is scanned
+              only by the first store of the process or when the estimate goes over the size cap.
+            * Entries are evicted down to LOWMARK of the size cap, so that the scans are amortized over the stores.
+
+        Args:
+            key (str): Cache key
+            text (str): MSX basic text
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        #Write by the unique temporary so that concurrent workers never see partial entry
+        tmp = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(tmp, 'w', encoding='ascii', newline='') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+        directory = os.path.abspath(self.directory)
+        total = _estimates.get(directory)
+        if total is None:
+            #The scan includes the entry just stored
+            total = sum(e[1] for e in self.entries())
+        else:
+            total += len(text)
+        _estimates[directory] = total
+        if total > self.maxsize:
+            self.evict(int(self.maxsize * LOWMARK))
+
+    def entries(self):
+        """Cache entries in LRU order
+
+        Returns:
+            list[tuple]: Access time, size and path by the entry, the oldest first
+        """
+        result = []
+        try:
+            with os.scandir(self.directory) as it:
+                for e in it:
+                    if e.name.endswith(ENTRYEXT):
+                        try:
+                            st = e.stat()
+                        except OSError:
+                            continue
+                        result.append((st.st_mtime, st.st_size, e.path))
+        except OSError:
+            pass
+        result.sort()
+        return result
+
+    def evict(self, limit=None):
+        """Remove least recently used entries until the total size fits the limit
+
+        Args:
+            limit (int): Size limit in bytes (None: the size cap)
+
+        Returns:
+            int: Number of removed entries
+        """
+        limit = self.maxsize if limit is None else limit
+        entries = self.entries()
+        total = sum(e[1] for e in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            total -= size
+        _estimates[os.path.abspath(self.directory)] = total
+        return removed
+
+    def clear(self):
+        """Remove all entries
+
+        Returns:
+            int: Number of removed entries
+        """
+        removed = 0
+        for mtime, size, path in self.entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        _estimates.pop(os.path.abspath(self.directory), None)
+        return removed
+
+def convert(mb, lcfile, fp, cache):
+    """Conversion through the cache
+
+        * In case of hit neither Basic.loads() nor the conversion is called.
+
+    Args:
+        mb (Basic): Configured Basic instance
+        lcfile (str): The path of LovelyComposer source file
+        fp: Writable text file object
+        cache (Cache): Conversion cache
+
+    Returns:
+        bool: True in case of cache hit
+    """
+    with open(lcfile, 'rb') as f:
+        lcdata = f.read()
+    key = cache.key(lcdata, mb.settings())
+    text = cache.get(key)
+    if text is not None:
+        fp.write(text)
+        return True
+
+    mb.loads(lcdata.decode('utf-8'))
+    buf = io.StringIO()
+    mb.write(buf)
+    text = buf.getvalue()
+    cache.put(key, text)
+    fp.write(text)
+    return False
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""NumPy-backed MSX mml conversion engine module
+
+    Vectorized counterpart of Basic.iter_channel() and Basic.mixer().
+    Octave and scale lookup, octave macro elision, line separation and mixer detection
+    are computed as whole-array operations over the compact song representation,
+    and the result is byte-identical to the pure-Python engine.
+
+    NumPy is optional; available() tells whether this engine can be used.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .msxmml import MMLVALS
+from .msxmml import LCVALS
+from .msxmml import MSXVALS
+from .msxmml import Song
+
+def available():
+    """Whether NumPy is installed
+
+    Returns:
+        bool: True if this engine can be used
+    """
+    return np is not None
+
+def mixer(song):
+    """Auto detection of mixing register value by the tone IDs of the song
+
+    Args:
+        song (Song): Compact song representation
+
+    Returns:
+        int: The value for register 7 of the song
+    """
+    smask = MSXVALS.SMASK.value
+    nmask = MSXVALS.NMASK.value
+    noiseid = np.array(LCVALS.NOISEID.value)
+    mixer = MSXVALS.ALLMASK.value
+
+    for ch in song.channels:
+        ids = np.frombuffer(ch.ids, dtype=np.int16)
+        voices = np.frombuffer(ch.voices, dtype=np.int8).astype(bool)
+        tones = ids[voices & (ids != Song.NOID)]
+        noise = np.isin(tones, noiseid)
+        if noise.any():
+            mixer &= ~nmask
+        if not noise.all():
+            mixer &= ~smask
+        smask <<= 1
+        nmask <<= 1
+
+    return mixer
+
+def _tokens(ch, table, num2macro):
+    """Convert voiced notes of single channel to MSX MML tokens
+
+    Args:
+        ch (Channel): Compact channel representation
+        table (tuple[tuple[str]]): Lookup table of Basic, whose last element is the rest
+        num2macro: Fallback conversion for LC note numbers beyond the table
+
+    Returns:
+        tuple: Step indices of voiced notes and object array of their tokens
+    """
+    octave = MMLVALS.OCTAVE.value
+
+    notes = np.frombuffer(ch.notes, dtype=np.int16)
+    voices = np.frombuffer(ch.voices, dtype=np.int8).astype(bool)
+    index = np.flatnonzero(voices)
+
+    #Table indices of voiced notes, Song.REST as the last element and extras for large numbers
+    entries = list(table[:-1])
+    nums = notes[index].astype(np.int64)
+    large = nums >= len(entries)
+    if large.any():
+        extra = np.unique(nums[large])
+        for num in extra.tolist():
+            entries.append(num2macro(num))
+        nums[large] = len(table) - 1 + np.searchsorted(extra, nums[large])
+    entries.append(table[-1])
+    nums[nums < 0] = len(entries) - 1
+
+    #Per table entry string arrays and value codes for octave comparison
+    full = np.array([m + v + s for m, v, s in entries], dtype=object)
+    scaleonly = np.array([s for m, v, s in entries], dtype=object)
+    isoctave = np.array([m == octave for m, v, s in entries])
+    values = {}
+    codes = np.array([values.setdefault(v, len(values)) for m, v, s in entries])
+
+    #Secure last octave level to save octave macro usage
+    tokens = full[nums]
+    octnotes = np.flatnonzero(isoctave[nums])
+    if len(octnotes) > 1:
+        octcodes = codes[nums[octnotes]]
+        same = np.append(False, octcodes[1:] == octcodes[:-1])
+        elided = octnotes[same]
+        tokens[elided] = scaleonly[nums[elided]]
+
+    return index, tokens
+
+def channel_bars(ch, table, num2macro):
+    """Convert single channel to MSX MML tokens by the bar
+
+    Args:
+        ch (Channel): Compact channel representation
+        table (tuple[tuple[str]]): Lookup table of Basic, whose last element is the rest
+        num2macro: Fallback conversion for LC note numbers beyond the table
+
+    Returns:
+        list[list[str]]: MML token by the step of each bar, empty for the step without LC voice
+    """
+    index, tokens = _tokens(ch, table, num2macro)
+    steps = np.full(len(ch.notes), '', dtype=object)
+    steps[index] = tokens
+    steps = steps.tolist()
+    bars = ch.bars.tolist()
+    return [steps[a:b] for a, b in zip(bars[:-1], bars[1:])]
+
+def channel_lines(ch, table, num2macro, count=None):
+    """Convert single channel to MSX MML strings by the line
+
+    Args:
+        ch (Channel): Compact channel representation
+        table (tuple[tuple[str]]): Lookup table of Basic, whose last element is the rest
+        num2macro: Fallback conversion for LC note numbers beyond the table
+        count: Function called with MML tokens of voiced notes (None: not called)
+
+    Returns:
+        list[str]: MML string for each line of the channel
+    """
+    linenotes = MSXVALS.LINENOTES.value
+
+    index, tokens = _tokens(ch, table, num2macro)
+    if count is not None:
+        count(tokens.tolist())
+    if len(index) == 0:
+        return []
+
+    #Position of each voiced note in its bar, and whether it is last voiced note of the bar
+    bars = np.frombuffer(ch.bars, dtype=np.dtype(ch.bars.typecode))
+    bar = np.searchsorted(bars, index, side='right') - 1
+    position = index - bars[bar]
+    lastinbar = np.append(bar[1:] != bar[:-1], True)
+
+    #Separate mml by 8 notes because of MSX BASIC line constraints
+    breaks = np.flatnonzero((position % linenotes == linenotes-1) | lastinbar) + 1
+    tokens = tokens.tolist()
+    starts = [0] + breaks[:-1].tolist()
+    return [''.join(tokens[a:b]) for a, b in zip(starts, breaks.tolist())]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""MSX mml conversion instrumentation module
+
+    Per-stage timers and counters of the conversion.
+    Basic holds NULLPROFILE unless instrumented, whose operations do nothing,
+    and counters are taken by the bar or by the line, so that the overhead stays near zero.
+
+   Stages:
+    * read: Parsing LovelyComposer jsonl into the song
+    * lc2mml: Conversion of LC notes into the lines of channel strings and the mixer detection,
+      either by Basic.lc2mml() or while the lines are streamed
+    * generate: Coupling, dedup, optimization and emission of the lines
+    * write: Writing the lines to the file including tokenization
+"""
+
+from time import perf_counter
+
+STAGES = ('read', 'lc2mml', 'generate', 'write')
+
+class _Stage:
+    """Context manager timing single stage of the profile
+    """
+    __slots__ = ('profile', 'name')
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.profile._enter(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profile._exit()
+        return False
+
+class _NullStage:
+    """Context manager doing nothing
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+class Profile:
+    """Timers and counters of the conversion
+
+        Constraints
+            * Nested stages are exclusive, so that the time of the inner stage is not
+              counted in the outer one and the sum of stages is the total time.
+            * Every counter is accumulated over the conversions using this profile.
+
+    Args:
+        timers (dict[str, float]): Elapsed seconds by the stage
+        notes (int): Voiced notes processed including rests
+        rests (int): Rests processed
+        elided (int): Octave macros elided by the same octave level as the previous note
+        lines (int): Lines emitted
+        channelbytes (list[int]): Bytes of 'PLAY' arguments by the channel
+        mixer (int): The last value for register 7 (None: not converted)
+    """
+    enabled = True
+
+    def __init__(self):
+        """Initialization
+        """
+        self.timers = {}
+        self.notes = 0
+        self.rests = 0
+        self.elided = 0
+        self.lines = 0
+        self.channelbytes = [0, 0, 0]
+        self.mixer = None
+        self._stack = []
+
+    def stage(self, name):
+        """Timer of the stage
+
+        Args:
+            name (str): Stage name
+
+        Returns:
+            Context manager measuring the stage
+        """
+        return _Stage(self, name)
+
+    def _enter(self, name):
+        now = perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.timers[outer[0]] = self.timers.get(outer[0], 0.0) + now - outer[1]
+        self._stack.append([name, now])
+
+    def _exit(self):
+        now = perf_counter()
+        name, start = self._stack.pop()
+        self.timers[name] = self.timers.get(name, 0.0) + now - start
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def tokens(self, tokens):
+        """Count MML tokens of voiced notes
+
+        Args:
+            tokens (list[str]): MML tokens, empty ones for the steps without LC voice are ignored
+        """
+        for token in tokens:
+            if token:
+                self.notes += 1
+                head = token[0]
+                if head == 'R':
+                    self.rests += 1
+                elif head != 'O' and head != 'N':
+                    self.elided += 1
+
+    def line(self, strs):
+        """Count single line of 'PLAY' arguments
+
+        Args:
+            strs (list[str]): 'PLAY' arguments by the channel as written in the line
+        """
+        self.lines += 1
+        for c, arg in enumerate(strs):
+            self.channelbytes[c] += len(arg)
+
+    def asdict(self):
+        """All timers and counters
+
+        Returns:
+            dict: JSON serializable timers and counters
+        """
+        return dict(timers=dict(self.timers), \
+            total=sum(self.timers.values()), \
+            notes=self.notes, \
+            rests=self.rests, \
+            elided=self.elided, \
+            lines=self.lines, \
+            channelbytes=list(self.channelbytes), \
+            mixer=self.mixer)
+
+    def report(self):
+        """Human readable report
+
+        Returns:
+            list[str]: Report lines
+        """
+        total = sum(self.timers.values())
+        #Stages in the order of the conversion, and others as entered
+        names = [name for name in STAGES if name in self.timers] + [name for name in self.timers if name not in STAGES]
+        lines = ['{0:<9}: {1:8.2f} ms'.format(name, self.timers[name] * 1e3) for name in names]
+        lines.append('{0:<9}: {1:8.2f} ms'.format('total', total * 1e3))
+        lines.append('notes {0}, rests {1}, elided octaves {2}, lines {3}'.format( \
+            self.notes, self.rests, self.elided, self.lines))
+        lines.append('bytes by channel {0}, mixer {1}'.format( \
+            ' / '.join(str(b) for b in self.channelbytes), \
+            '' if self.mixer is None else '&B' + format(self.mixer, '06b')))
+        return lines
+
+class NullProfile:
+    """Profile doing nothing, used while instrumentation is off
+    """
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def tokens(self, tokens):
+        pass
+
+    def line(self, strs):
+        pass
+
+NULLPROFILE = NullProfile()
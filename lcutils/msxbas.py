@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tokenized MSX basic module
+
+    Conversion between ASCII MSX basic lines and the tokenized binary .bas format.
+
+    The binary format starts with 0xFF, and each line consists of the link pointer
+    to the next line in memory, the line number, tokenized statements and 0x00.
+    The program ends with null link pointer.
+
+   Constraints:
+    * Only the keywords and the syntax used by this converter are supported.
+    * Hexadecimal, octal and floating point constants are not supported.
+"""
+
+from enum import Enum
+from .msxmml import MSXVALS
+
+class BASVALS(Enum):
+    """Constants in tokenized MSX basic
+
+    Args:
+        HEADER (int): First byte of tokenized basic file
+        BASE (int): Memory address of the first line
+        KEYWORDS (dict[str, int]): Keyword tokens
+        DIGIT (int): Token of single digit constant 0
+        BYTE (int): Prefix of 1 byte constant 10-255
+        WORD (int): Prefix of 2 bytes constant 256-32767
+        LINENUM (int): Prefix of line number constant
+        LINEREFS (tuple[str]): Keywords followed by line number constants
+    """
+    HEADER = 0xFF
+    BASE = 0x8001
+    KEYWORDS = {
+        'END': 0x81,
+        'GOTO': 0x89,
+        'GOSUB': 0x8D,
+        'RETURN': 0x8E,
+        'PLAY': 0xC1,
+        'SOUND': 0xC4,
+        '=': 0xEF,
+        '+': 0xF1,
+        }
+    DIGIT = 0x11
+    BYTE = 0x0F
+    WORD = 0x1C
+    LINENUM = 0x0E
+    LINEREFS = ('GOTO', 'GOSUB')
+
+def _parse(line):
+    """Separate ASCII basic line into the line number and statements
+
+    Args:
+        line (str): Single line of ASCII MSX basic
+
+    Returns:
+        tuple: line number (int) and statements (str)
+
+    Raises:
+        ValueError: The line number is not an integer from 0 to MSXVALS.MAXROW
+    """
+    text = line.rstrip('\r\n')
+    number, sep, body = text.partition(' ')
+    if not number.isdigit() or int(number) > MSXVALS.MAXROW.value:
+        raise ValueError('Invalid line number \'{0}\' (0-{1})'.format(number, MSXVALS.MAXROW.value))
+    return int(number), body
+
+def _tokenize(body, buf, pos):
+    """Tokenize statements of single line into the buffer
+
+    Args:
+        body (str): Statements of ASCII MSX basic line
+        buf (bytearray): Destination buffer
+        pos (int): Start position in the buffer
+
+    Returns:
+        int: Position next to the tokenized statements
+    """
+    keywords = BASVALS.KEYWORDS.value
+    names = sorted(keywords, key=len, reverse=True)
+    linerefs = BASVALS.LINEREFS.value
+    lineref = False
+    ident = False
+    i = 0
+
+    while i < len(body):
+        ch = body[i]
+
+        #String literal is kept as is
+        if ch == '"':
+            end = body.find('"', i + 1)
+            end = len(body) if end < 0 else end + 1
+            data = body[i:end].encode('ascii')
+            buf[pos:pos+len(data)] = data
+            pos += len(data)
+            i = end
+            ident = False
+            continue
+
+        #Binary constant is kept as ASCII characters
+        if ch == '&':
+            end = i + 1
+            while end < len(body) and (body[end].isalnum()):
+                end += 1
+            data = body[i:end].encode('ascii')
+            buf[pos:pos+len(data)] = data
+            pos += len(data)
+            i = end
+            ident = False
+            continue
+
+        if ch.isdigit() and not ident:
+            end = i
+            while end < len(body) and body[end].isdigit():
+                end += 1
+            value = int(body[i:end])
+            if lineref:
+                buf[pos] = BASVALS.LINENUM.value
+                buf[pos+1:pos+3] = value.to_bytes(2, 'little')
+                pos += 3
+            elif value < 10:
+                buf[pos] = BASVALS.DIGIT.value + value
+                pos += 1
+            elif value < 256:
+                buf[pos] = BASVALS.BYTE.value
+                buf[pos+1] = value
+                pos += 2
+            else:
+                buf[pos] = BASVALS.WORD.value
+                buf[pos+1:pos+3] = value.to_bytes(2, 'little')
+                pos += 3
+            i = end
+            continue
+
+        for name in names:
+            if body.startswith(name, i):
+                buf[pos] = keywords[name]
+                pos += 1
+                i += len(name)
+                lineref = name in linerefs
+                ident = False
+                break
+        else:
+            buf[pos] = ord(ch)
+            pos += 1
+            i += 1
+            ident = ch.isalpha() or ch == '_' or (ident and ch.isdigit())
+            if ch not in ' ,':
+                lineref = False
+
+    return pos
+
+def tokenize(lines):
+    """Convert ASCII MSX basic lines to tokenized binary basic
+
+        The program is built in single preallocated bytearray.
+
+    Args:
+        lines (list[str]): Lines of ASCII MSX basic as Basic.generate() produces
+
+    Returns:
+        bytes: Tokenized binary basic file content
+
+    Raises:
+        ValueError: The line number is invalid, or the program exceeds MSX memory
+    """
+    #Header, and link pointer, line number and terminator by the line, and the end of program
+    size = 1 + sum(len(line) + 5 for line in lines) + 2
+    buf = bytearray(size)
+    buf[0] = BASVALS.HEADER.value
+    pos = 1
+
+    for line in lines:
+        number, body = _parse(line)
+        start = pos
+        buf[pos+2:pos+4] = number.to_bytes(2, 'little')
+        pos = _tokenize(body, buf, pos + 4)
+        buf[pos] = 0
+        pos += 1
+        #Link pointer refers to the next line in the memory
+        link = BASVALS.BASE.value + pos - 1
+        if link > 0xFFFF:
+            raise ValueError('Program exceeds MSX memory at line {0}'.format(number))
+        buf[start:start+2] = link.to_bytes(2, 'little')
+
+    buf[pos:pos+2] = b'\x00\x00'
+    pos += 2
+    del buf[pos:]
+    return bytes(buf)
+
+def detokenize(data):
+    """Convert tokenized binary basic to ASCII MSX basic lines
+
+    Args:
+        data (bytes): Tokenized binary basic file content
+
+    Returns:
+        list[str]: Lines of ASCII MSX basic including line feed
+    """
+    if len(data) == 0 or data[0] != BASVALS.HEADER.value:
+        raise ValueError('Not tokenized MSX basic')
+    names = {v: k for k, v in BASVALS.KEYWORDS.value.items()}
+    lines = []
+    pos = 1
+
+    while pos + 2 <= len(data) and data[pos:pos+2] != b'\x00\x00':
+        number = int.from_bytes(data[pos+2:pos+4], 'little')
+        pos += 4
+        text = []
+        quoted = False
+        while data[pos] != 0:
+            b = data[pos]
+            pos += 1
+            if quoted or 0x20 <= b < 0x80:
+                text.append(chr(b))
+                if b == 0x22:
+                    quoted = not quoted
+            elif b in names:
+                text.append(names[b])
+            elif BASVALS.DIGIT.value <= b < BASVALS.DIGIT.value + 10:
+                text.append(str(b - BASVALS.DIGIT.value))
+            elif b == BASVALS.BYTE.value:
+                text.append(str(data[pos]))
+                pos += 1
+            elif b in (BASVALS.WORD.value, BASVALS.LINENUM.value):
+                text.append(str(int.from_bytes(data[pos:pos+2], 'little')))
+                pos += 2
+            else:
+                raise ValueError('Unsupported token 0x{0:02X} in line {1}'.format(b, number))
+        pos += 1
+        lines.append('{0} {1}\n'.format(number, ''.join(text)))
+
+    return lines
+
+def write(fp, lines):
+    """Write tokenized binary basic to the file object
+
+    Args:
+        fp: Writable binary file object
+        lines (list[str]): Lines of ASCII MSX basic as Basic.generate() produces
+
+    Returns:
+        int: Number of written bytes
+
+    Raises:
+        ValueError: The line number is invalid, or the program exceeds MSX memory
+    """
+    return fp.write(tokenize(lines))
@@ -10,11 +10,15 @@
     * Extended MSX basic (MSX-MUSIC) mml
     * Volume macro designation by the each note
     * Simple tone reflection functionality in case of MGS/ext-basic mml
-    * Note coupling functionality (to be considered)
+    * Note coupling functionality for sustained notes (to be considered)
 """
 
-import json
+from array import array
 from enum import Enum
+from itertools import chain
+from itertools import compress
+from typing import NamedTuple
+from .instrument import NULLPROFILE
 
 class MMLVALS(Enum):
     """Constants in MUSIC macro language common
@@ -71,6 +75,14 @@ class MSXVALS(Enum):
         DEFLEN (int): Default note length
         DEFTEMPO (int): Default tempo
         DEFVOLUME (int): Default volume
+        MAXLEN (int): Maximum note length
+        MAXLINE (int): Maximum characters of single line in MSX basic
+        MAXROW (int): Maximum line number in MSX basic
+        TICKRATES (tuple[int]): Interrupts per second of NTSC and PAL machines, which count note durations
+        RESERVED (tuple[str]): Reserved words not available as variable names
+        ENGINES (tuple[str]): Conversion engines
+        DEFENGINE (str): Default conversion engine
+        TARGETS (tuple[str]): Output targets of multi-target conversion
     """
     SMASK = 0b000001
     NMASK = 0b001000
@@ -82,6 +94,174 @@ class MSXVALS(Enum):
     DEFLEN = 16
     DEFTEMPO = 140
     DEFVOLUME = 12
+    MAXLEN = 64
+    MAXLINE = 255
+    MAXROW = 65529
+    TICKRATES = (60, 50)
+    RESERVED = ('AS', 'FN', 'GO', 'IF', 'ON', 'OR', 'TO')
+    ENGINES = ('python', 'numpy')
+    DEFENGINE = 'python'
+    TARGETS = ('basic', 'ext', 'nmacro')
+
+class Channel:
+    """Compact array-backed notes of single LovelyComposer channel
+
+        All bars are packed into flat arrays, and bar b takes [bars[b], bars[b+1]) range.
+
+    Args:
+        notes (array[int]): LC 'n' item by the note, Song.REST for the rest
+        ids (array[int]): LC 'id' item by the note, Song.NOID for none
+        voices (array[int]): 1 if LC voice is present by the note, otherwise 0
+        bars (array[int]): Start offset by the bar and the end offset
+    """
+    __slots__ = ('notes', 'ids', 'voices', 'bars')
+
+    def __init__(self):
+        """Initialization
+        """
+        self.notes = array('h')
+        self.ids = array('h')
+        self.voices = array('b')
+        self.bars = array('l', [0])
+
+    def numbars(self):
+        """Number of bars
+
+        Returns:
+            int: Number of bars in the channel
+        """
+        return len(self.bars) - 1
+
+    def numnotes(self):
+        """Number of notes
+
+        Returns:
+            int: Number of notes cut to 'play_notes' in the channel
+        """
+        return len(self.notes)
+
+class Song:
+    """Compact intermediate representation of LovelyComposer single song
+
+        Constraints
+            * Notes beyond 'play_notes' count of each bar are dropped.
+            * Non-integer or negative LC 'n' item is held as REST, and none of 'id' item as NOID.
+    """
+    REST = -1
+    NOID = -1
+
+    def __init__(self):
+        """Initialization
+        """
+        self.channels = [Channel() for c in range(MSXVALS.CHANNELS.value)]
+
+    @classmethod
+    def from_dict(cls, lcsong):
+        """Build the representation from LC song data dictionary
+
+        Args:
+            lcsong (dict): LC song data dictionary except of jsonl header context
+
+        Returns:
+            Song: Built song
+        """
+        song = cls()
+        lcvo = LCVALS.LCVO.value
+        nkey = LCVALS.N.value
+        idkey = LCVALS.ID.value
+        vlkey = LCVALS.VL.value
+        pnkey = LCVALS.PN.value
+        rest = cls.REST
+        noid = cls.NOID
+
+        channels = lcsong[LCVALS.CH.value][LCVALS.CH.value]
+
+        for c in range(MSXVALS.CHANNELS.value):
+            ch = song.channels[c]
+            notes = []
+            ids = []
+            voices = []
+            for voicelist in channels[c][LCVALS.SL.value]:
+                for note in voicelist[vlkey][:voicelist[pnkey]]:
+                    num = note[nkey]
+                    tone = note[idkey]
+                    notes.append(num if type(num) == int and num >= 0 else rest)
+                    ids.append(tone if type(tone) == int else noid)
+                    voices.append(1 if note[lcvo] else 0)
+                ch.bars.append(len(notes))
+            ch.notes.extend(notes)
+            ch.ids.extend(ids)
+            ch.voices.extend(voices)
+
+        return song
+
+    def numnotes(self):
+        """Number of notes
+
+        Returns:
+            int: Number of notes of all channels
+        """
+        return sum(ch.numnotes() for ch in self.channels)
+
+class Options(NamedTuple):
+    """Immutable conversion parameters
+
+        The fields are same as keyword arguments of Basic.configure().
+
+    Args:
+        start (int): Start line number for MSX basic list
+        step (int): Steps of line interval for MSX basic list
+        notelen (int): Designated basic note length in MSX music macro language
+        tempo (int): Designated tempo in MSX music macro language
+        volume (int): Designated volume for all channel in MSX music macro language
+        extend (bool): Use exnteded basic for play syntax
+        nmacro (bool): Use 'N' macro instead of octave and scale
+        engine (str): Conversion engine, 'python' or 'numpy' (NumPy is required)
+        couple (bool): Couple consecutive rests into the shortest length notation of the same ticks
+        pack (bool): Fill each line up to MSX basic line length instead of 8 notes
+        dedup (bool): Share repeated mml strings by string variables
+        optimize (bool): Re-encode octaves and default lengths into the shortest notation
+    """
+    start: int = MSXVALS.DEFLINE.value
+    step: int = MSXVALS.DEFSTEP.value
+    notelen: int = MSXVALS.DEFLEN.value
+    tempo: int = MSXVALS.DEFTEMPO.value
+    volume: int = MSXVALS.DEFVOLUME.value
+    extend: bool = False
+    nmacro: bool = False
+    engine: str = MSXVALS.DEFENGINE.value
+    couple: bool = False
+    pack: bool = False
+    dedup: bool = False
+    optimize: bool = False
+
+class Stats(NamedTuple):
+    """Statistics of single conversion
+
+    Args:
+        savedbytes (int): Bytes saved by coupling of rests
+        optimizedbytes (int): Bytes saved by size-optimal encoding
+        references (int): Channel strings referring to shared string variables
+        strings (int): All channel strings
+        names (tuple[tuple[str, str]]): Shared MML string and its variable name in the order of definitions
+    """
+    savedbytes: int = 0
+    optimizedbytes: int = 0
+    references: int = 0
+    strings: int = 0
+    names: tuple = ()
+
+class Result(NamedTuple):
+    """Result of single conversion
+
+    Args:
+        lines (tuple[str]): Entire playable MSX mml including line numbers and line feeds
+        mixer (int): The value for register 7 of the song
+        stats (Stats): Statistics of the conversion
+    """
+    lines: tuple
+    mixer: int
+    stats: Stats
 
 class Basic:
     """Conversion features for MSX basic mml
@@ -90,13 +270,16 @@ class Basic:
             * For PSG conversion it does not support application of tone.
             * Assign note scale to MSX mml O1-O7 (O8 is not used).
             * Assign same volume level for all channels.
-            * Currently it is not supported coupling of note duration.
-              This is in some meaning reflecting original LC spec as is.
+            * Coupling of note duration is optional and applies to consecutive rests only,
+              into the lengths MSX plays in the same ticks as the separate rests.
+              Each note is kept as is in some meaning reflecting original LC spec.
     """
+    MAXBARCACHE = 65536
+
     def __init__(self):
         """Initialization
         """
-        self.lcsong = {}
+        self.song = Song()
         self.notes = []
         self.mml = []
         self._line = MSXVALS.DEFLINE.value
@@ -107,11 +290,23 @@ class Basic:
         self._volume = MSXVALS.DEFVOLUME.value
         self._extend = False
         self._nmacro = False
+        self._engine = MSXVALS.DEFENGINE.value
+        self._couple = False
+        self._pack = False
+        self._dedup = False
+        self._optimize = False
+        self.savedbytes = 0
+        self.optimizedbytes = 0
+        self.dedupnames = {}
+        self.dedupcount = (0, 0)
+        self._barcache = None
+        self.profile = NULLPROFILE
+        self._maketable()
     
     def clear(self):
         """Set all members to default
         """
-        self.lcsong.clear()
+        self.song = Song()
         self.notes.clear()
         self.mml.clear()
         self._line = MSXVALS.DEFLINE.value
@@ -122,20 +317,63 @@ class Basic:
         self._volume = MSXVALS.DEFVOLUME.value
         self._extend = False
         self._nmacro = False
+        self._engine = MSXVALS.DEFENGINE.value
+        self._couple = False
+        self._pack = False
+        self._dedup = False
+        self._optimize = False
+        self.savedbytes = 0
+        self.optimizedbytes = 0
+        self.dedupnames = {}
+        self.dedupcount = (0, 0)
+        self._barcache = None
+        self.profile = NULLPROFILE
+        self._maketable()
 
     def read(self, lcfile):
-        """Read LovelyComposer single song as the dictionary object.
+        """Read LovelyComposer single song as the compact representation.
 
-            The data shall be stored to self.lcsong[].
+            The data shall be stored to self.song, and the dictionary tree is dropped.
 
         Args:
             lcfile (str): The path of LovelyComposer source file
         """
-        self.lcsong.clear()
-        with open (lcfile, 'r', encoding='utf-8') as f:
+        import json
+        with self.profile.stage('read'):
+            with open (lcfile, 'r', encoding='utf-8') as f:
+                #Ignore first line because of LC file header
+                f.readline()
+                self.song = Song.from_dict(json.load(f))
+
+    def loads(self, lctext):
+        """Read LovelyComposer single song from the jsonl text.
+
+            The data shall be stored to self.song, and the dictionary tree is dropped.
+
+        Args:
+            lctext (str): The whole content of LovelyComposer source file
+        """
+        import json
+        with self.profile.stage('read'):
             #Ignore first line because of LC file header
-            f.readline()
-            self.lcsong = json.load(f)
+            self.song = Song.from_dict(json.loads(lctext.split('\n', 1)[-1]))
+
+    def instrument(self, profile=None):
+        """Enable per-stage timers and counters
+
+            * Instrumentation is turned off by clear() or by setting NULLPROFILE to self.profile.
+
+        Args:
+            profile (Profile): Profile accumulating the results (None: new one)
+
+        Returns:
+            Profile: Profile set to self.profile
+        """
+        if profile is None:
+            from .instrument import Profile
+            profile = Profile()
+        self.profile = profile
+        return profile
 
     def configure(self, \
         start: int=MSXVALS.DEFLINE.value, \
@@ -145,6 +383,11 @@ class Basic:
         volume: int=MSXVALS.DEFVOLUME.value, \
         extend: bool=False, \
         nmacro: bool=False, \
+        engine: str=MSXVALS.DEFENGINE.value, \
+        couple: bool=False, \
+        pack: bool=False, \
+        dedup: bool=False, \
+        optimize: bool=False, \
         ):
         """Configure conversion parameters
 
@@ -157,10 +400,22 @@ class Basic:
             tempo (int): Designated tempo in MSX music macro language
             volume (int): Designated volume for all channel in MSX music macro language
             extend (bool): Use exnteded basic for play syntax
+            nmacro (bool): Use 'N' macro instead of octave and scale
+            engine (str): Conversion engine, 'python' or 'numpy' (NumPy is required)
+            couple (bool): Couple consecutive rests into the shortest length notation of the same ticks
+            pack (bool): Fill each line up to MSX basic line length instead of 8 notes
+            dedup (bool): Share repeated mml strings by string variables
+            optimize (bool): Re-encode octaves and default lengths into the shortest notation
 
         Returns:
             list[str]: Entire playable MSX mml as the conversion result
         """
+        if engine not in MSXVALS.ENGINES.value:
+            raise ValueError('Unknown conversion engine \'{0}\''.format(engine))
+        if engine == 'numpy':
+            from . import fastmml
+            if not fastmml.available():
+                raise ImportError('NumPy is required for \'numpy\' conversion engine')
         self._line = start
         self._step = step
         self._notelen = notelen
@@ -168,23 +423,59 @@ class Basic:
         self._volume = volume
         self._extend = extend
         self._nmacro = nmacro
+        self._engine = engine
+        self._couple = couple
+        self._pack = pack
+        self._dedup = dedup
+        self._optimize = optimize
+        self._maketable()
 
-    def num2macro(self, num):
-        """Conversion from LC num item to MML notation macro
+    def options(self):
+        """Current conversion parameters as the immutable object
+
+        Returns:
+            Options: Conversion parameters
+        """
+        return Options(start=self._line, \
+            step=self._step, \
+            notelen=self._notelen, \
+            tempo=self._tempo, \
+            volume=self._volume, \
+            extend=self._extend, \
+            nmacro=self._nmacro, \
+            engine=self._engine, \
+            couple=self._couple, \
+            pack=self._pack, \
+            dedup=self._dedup, \
+            optimize=self._optimize)
+
+    def settings(self):
+        """Current conversion parameters
+
+        Returns:
+            dict: Keyword arguments for configure() method
+        """
+        return self.options()._asdict()
+
+    @staticmethod
+    def calcmacro(num, notelen, nmacro):
+        """Calculation from LC num item to MML notation macro without the lookup table
 
         Args:
             num (int): LovelyComposer 'n' item
+            notelen (int): Designated basic note length in MSX music macro language
+            nmacro (bool): Use 'N' macro instead of octave and scale
 
         Returns:
             tuple[str]: macro[octave or rest], value[note length or octave level] and scale char(s)
         """
         macro = MMLVALS.REST.value
-        value = str(self._notelen)
+        value = str(notelen)
         index = MMLVALS.NUMSCALE.value
 
         if type(num) == int:
-            if self._nmacro:
-                value = str(int(num - LCVALS.MINNUM.value))
+            if nmacro:
+                value = str(int(num - LCVALS.MINNUM.value) + 1)
                 macro = MMLVALS.LEVEL.value
             else:
                 value = str(int((num - LCVALS.MINNUM.value)/MMLVALS.NUMSCALE.value)+1)
@@ -194,6 +485,389 @@ class Basic:
 
         return macro, value, scale
 
+    def _maketable(self):
+        """Build the lookup tables of MML notation macro for all LC note numbers
+
+            * Tables are indexed by LC 'n' item up to LCVALS.MAXNUM, and the last element is the rest.
+            * Both octave and 'N' macro variants are built, and self._table refers to the current one.
+        """
+        nums = list(range(LCVALS.MAXNUM.value+1)) + [None]
+        self._otable = tuple(self.calcmacro(n, self._notelen, False) for n in nums)
+        self._ntable = tuple(self.calcmacro(n, self._notelen, True) for n in nums)
+        self._table = self._ntable if self._nmacro else self._otable
+
+        #Rest notations by the number of steps they take, and the shortest ones found so far.
+        #MSX counts each note in whole interrupt ticks, so that the notation is taken
+        #only if it lasts as many ticks as the single steps it replaces.
+        rest = MMLVALS.REST.value
+        notelen = self._notelen
+        rates = MSXVALS.TICKRATES.value
+        stepticks = [rate * 240 // (self._tempo * notelen) for rate in rates]
+        chunks = {1: rest}
+        for l in range(1, MSXVALS.MAXLEN.value+1):
+            for dots, num, den in (('', 1, 1), ('.', 3, 2), ('..', 7, 4)):
+                if (notelen * num) % (l * den) == 0:
+                    steps = (notelen * num) // (l * den)
+                    if any(rate * 240 * num // (self._tempo * l * den) != steps * ticks \
+                        for rate, ticks in zip(rates, stepticks)):
+                        continue
+                    token = rest + str(l) + dots
+                    if steps not in chunks or len(token) < len(chunks[steps]):
+                        chunks[steps] = token
+        self._restchunks = sorted(chunks.items())
+        self._restbest = ['']
+        #Pattern of consecutive rests is compiled on the first coupling
+        self._restre = None
+        #Cached bars depend on the table
+        if self._barcache is not None:
+            self._barcache = {}
+
+    def barcache(self, enable=True):
+        """Enable the cache of converted bars for repeated conversion of the edited song
+
+            * A bar is looked up by its notes and the octave level coming from the previous bar,
+              so that only changed bars and the bars whose incoming octave changed are converted.
+            * The cache is dropped by configure() and clear(), and only 'python' engine uses it.
+
+        Args:
+            enable (bool): Enable or disable the cache
+        """
+        self._barcache = {} if enable else None
+
+    def num2macro(self, num):
+        """Conversion from LC num item to MML notation macro
+
+        Args:
+            num (int): LovelyComposer 'n' item
+
+        Returns:
+            tuple[str]: macro[octave or rest], value[note length or octave level] and scale char(s)
+        """
+        if num is None:
+            return self._table[-1]
+        if type(num) == int and 0 <= num <= LCVALS.MAXNUM.value:
+            return self._table[num]
+        return self.calcmacro(num, self._notelen, self._nmacro)
+
+    def restnotation(self, count):
+        """Shortest MML notation of the consecutive rests
+
+            The lengths are chosen by the dynamic programming over the number of steps,
+            and the results are memorized, so that coupling runs in linear time.
+
+        Args:
+            count (int): Number of consecutive rests of the designated note length
+
+        Returns:
+            str: Rest macros taking the same duration
+        """
+        best = self._restbest
+        for k in range(len(best), count+1):
+            candidate = None
+            for steps, token in self._restchunks:
+                if steps > k:
+                    break
+                notation = best[k-steps] + token
+                if candidate is None or len(notation) < len(candidate):
+                    candidate = notation
+            best.append(candidate)
+        return best[count]
+
+    def couple(self, mml):
+        """Coupling of consecutive rests in single line of single channel
+
+        Args:
+            mml (str): MML string of the channel
+
+        Returns:
+            str: MML string whose rests are coupled
+        """
+        rest = MMLVALS.REST.value + str(self._notelen)
+        if self._restre is None:
+            import re
+            self._restre = re.compile('(?:{0})+'.format(re.escape(rest)))
+        restlen = len(rest)
+        return self._restre.sub(lambda m: self.restnotation(len(m.group()) // restlen), mml)
+
+    def mixer(self):
+        """Auto detection of mixing register value by the tone IDs of the song
+
+            Each note ID evaluates the sound or the noise bit of its channel one by one.
+
+        Returns:
+            int: The value for register 7 of the song
+        """
+        if self._engine == 'numpy':
+            from . import fastmml
+            return fastmml.mixer(self.song)
+
+        smask = MSXVALS.SMASK.value
+        nmask = MSXVALS.NMASK.value
+        noiseid = set(LCVALS.NOISEID.value)
+        mixer = MSXVALS.ALLMASK.value
+
+        for ch in self.song.channels:
+            tones = set(compress(ch.ids, ch.voices))
+            tones.discard(Song.NOID)
+            if tones & noiseid:
+                mixer &= ~nmask
+            if tones - noiseid:
+                mixer &= ~smask
+            smask <<= 1
+            nmask <<= 1
+
+        return mixer
+
+    def iter_bars(self, channel):
+        """Core generator converting single channel of LovelyComposer song to MSX MML tokens
+
+            This function just converts LC notes to simple MSX notes bar by bar.
+
+        Args:
+            channel (int): PSG channel number from 0
+
+        Yields:
+            list[str]: MML token by the step of the bar, empty for the step without LC voice
+        """
+        profile = self.profile
+        counting = profile.enabled
+
+        if self._engine == 'numpy':
+            from . import fastmml
+            for tokens in fastmml.channel_bars(self.song.channels[channel], self._table, self.num2macro):
+                if counting:
+                    profile.tokens(tokens)
+                yield tokens
+            return
+
+        #Secure constants as locals so that the innermost loop only does indexing
+        octave = MMLVALS.OCTAVE.value
+        table = self._table
+        tablesize = len(table) - 1
+        num2macro = self.num2macro
+
+        ch = self.song.channels[channel]
+        notes = ch.notes
+        voices = ch.voices
+        bars = ch.bars
+        cache = self._barcache
+        comparison = ''
+
+        for b in range(ch.numbars()):
+            start = bars[b]
+            end = bars[b+1]
+
+            if cache is not None:
+                key = (notes[start:end].tobytes(), voices[start:end].tobytes(), comparison, self._nmacro)
+                hit = cache.get(key)
+                if hit is not None:
+                    tokens, comparison = hit
+                    if counting:
+                        profile.tokens(tokens)
+                    yield list(tokens)
+                    continue
+
+            tokens = []
+
+            for num, voice in zip(notes[start:end], voices[start:end]):
+                if voice:
+                    #Song.REST indexes the rest as the last element of the table
+                    if num < tablesize:
+                        macro, value, scale = table[num]
+                    else:
+                        macro, value, scale = num2macro(num)
+
+                    #Secure last octave level to save octave macro usage
+                    if macro == octave:
+                        if value == comparison:
+                            macro = ''
+                            value = ''
+                        else:
+                            comparison = value
+
+                    tokens.append(macro + value + scale)
+                else:
+                    tokens.append('')
+
+            if cache is not None:
+                if len(cache) >= self.MAXBARCACHE:
+                    cache.clear()
+                cache[key] = (tuple(tokens), comparison)
+
+            if counting:
+                profile.tokens(tokens)
+            yield tokens
+
+    def iter_channel(self, channel):
+        """Generator converting single channel of LovelyComposer song to MSX MML strings
+
+            This function yields the mml separated by 8 notes because of MSX BASIC line constraints.
+
+        Args:
+            channel (int): PSG channel number from 0
+
+        Yields:
+            str: MML string for single line of the channel
+        """
+        if self._engine == 'numpy':
+            from . import fastmml
+            profile = self.profile
+            yield from fastmml.channel_lines(self.song.channels[channel], self._table, self.num2macro, \
+                profile.tokens if profile.enabled else None)
+            return
+
+        for tokens in self.iter_bars(channel):
+            yield from self._iter_split(tokens)
+
+    @staticmethod
+    def _iter_split(tokens):
+        """Separate MML tokens of single bar into lines
+
+            The line breaks depend only on the positions of voiced notes.
+
+        Args:
+            tokens (list[str]): MML token by the step of the bar, empty for the step without LC voice
+
+        Yields:
+            str: MML string for single line of the channel
+        """
+        linenotes = MSXVALS.LINENOTES.value
+        barstr = ''
+        for n in range(0, len(tokens), linenotes):
+            chunk = tokens[n:n+linenotes]
+            barstr += ''.join(chunk)
+
+            #Separate mml after the voiced 8th note
+            if len(chunk) == linenotes and chunk[-1]:
+                yield barstr
+                barstr = ''
+
+        if len(barstr) > 0:
+            yield barstr
+
+    def _iter_channel_tables(self, channel, tables):
+        """Generator converting single channel to MSX MML strings by several lookup tables at once
+
+            * Tokens of each table entry are joined beforehand, so that a note takes single lookup
+              by the table, and the tables without octave macro are mapped directly.
+            * The bar with notes beyond the tables is converted by calcmacro().
+
+        Args:
+            channel (int): PSG channel number from 0
+            tables (list[tuple[tuple[str]]]): Lookup tables, self._otable and/or self._ntable
+
+        Yields:
+            tuple[str]: MML strings for single line of the channel by the table
+        """
+        octave = MMLVALS.OCTAVE.value
+        tablesize = len(tables[0]) - 1
+        nmacros = [table is self._ntable for table in tables]
+        profile = self.profile
+        counting = profile.enabled
+
+        #Whole token, token without octave and octave level to be secured by the table entry
+        plans = []
+        for table in tables:
+            level = [v if m == octave else None for m, v, s in table]
+            plans.append(([m + v + s for m, v, s in table], \
+                [s for m, v, s in table], \
+                level if any(v is not None for v in level) else None))
+
+        ch = self.song.channels[channel]
+        notes = ch.notes
+        voices = ch.voices
+        bars = ch.bars
+        comparisons = ['' for table in tables]
+
+        for b in range(ch.numbars()):
+            barnotes = notes[bars[b]:bars[b+1]]
+            barvoices = voices[bars[b]:bars[b+1]]
+            bartokens = []
+
+            if len(barnotes) > 0 and max(barnotes) >= tablesize:
+                for k, table in enumerate(tables):
+                    tokens = []
+                    for num, voice in zip(barnotes, barvoices):
+                        if voice:
+                            if num < tablesize:
+                                macro, value, scale = table[num]
+                            else:
+                                macro, value, scale = self.calcmacro(num, self._notelen, nmacros[k])
+                            if macro == octave:
+                                if value == comparisons[k]:
+                                    macro = ''
+                                    value = ''
+                                else:
+                                    comparisons[k] = value
+                            tokens.append(macro + value + scale)
+                        else:
+                            tokens.append('')
+                    bartokens.append(tokens)
+            else:
+                for k, (full, short, level) in enumerate(plans):
+                    if level is None:
+                        bartokens.append([full[num] if voice else '' for num, voice in zip(barnotes, barvoices)])
+                        continue
+                    comparison = comparisons[k]
+                    tokens = []
+                    for num, voice in zip(barnotes, barvoices):
+                        if voice:
+                            value = level[num]
+                            if value is None:
+                                tokens.append(full[num])
+                            elif value == comparison:
+                                tokens.append(short[num])
+                            else:
+                                comparison = value
+                                tokens.append(full[num])
+                        else:
+                            tokens.append('')
+                    comparisons[k] = comparison
+                    bartokens.append(tokens)
+
+            if counting:
+                profile.tokens(bartokens[0])
+            yield from zip(*[self._iter_split(tokens) for tokens in bartokens])
+
+    def iter_packed(self, row, play):
+        """Generator packing MSX MML strings of 3 channels into lines up to MSX basic line length
+
+            * Every line takes the same number of steps in all channels, so that they keep in step.
+            * The line is filled as long as it fits MSXVALS.MAXLINE after coupling if enabled.
+
+        Args:
+            row (int): Line number of the first line
+            play (str): 'PLAY' syntax of the line
+
+        Yields:
+            tuple[str]: MML strings of 3 channels for single line
+        """
+        limit = MSXVALS.MAXLINE.value
+        channels = range(MSXVALS.CHANNELS.value)
+        streams = [chain.from_iterable(self.iter_bars(c)) for c in channels]
+        #Line number, space, 'PLAY', quotations and commas
+        fixed = 1 + len(play) + 3 * MSXVALS.CHANNELS.value - 1
+
+        strs = ['' for c in channels]
+        steps = 0
+        for tokens in zip(*streams):
+            candidate = [a + b for a, b in zip(strs, tokens)]
+            size = len(str(row)) + fixed + sum(len(mml) for mml in candidate)
+            if size > limit and self._couple:
+                size = len(str(row)) + fixed + sum(len(self.couple(mml)) for mml in candidate)
+
+            if size > limit and steps > 0:
+                yield tuple(strs)
+                row += self._step
+                strs = list(tokens)
+                steps = 1
+            else:
+                strs = candidate
+                steps += 1
+
+        if any(strs):
+            yield tuple(strs)
+
     def lc2mml(self, lcsong={}):
         """Core function converting LovelyComposer song data to MSX MML list by the channel sort
 
@@ -202,99 +876,381 @@ class Basic:
 
         Args:
             lcsong[dict]: LC song data dictionary except of jsonl header context.
+                It shall be converted to self.song if given.
         """
         if any(lcsong):
-            self.lcsong = lcsong
+            with self.profile.stage('read'):
+                self.song = Song.from_dict(lcsong)
 
-        self.notes.clear()
+        with self.profile.stage('lc2mml'):
+            self.notes.clear()
+            self._mixer = self.mixer()
+            self.profile.mixer = self._mixer
 
-        smask = MSXVALS.SMASK.value
-        nmask = MSXVALS.NMASK.value
+            for c in range(MSXVALS.CHANNELS.value):
+                self.notes.append(list(self.iter_channel(c)))
 
-        channels = self.lcsong[LCVALS.CH.value][LCVALS.CH.value]
+    def iter_lines(self):
+        """Streaming series of conversion
 
-        for c in range(MSXVALS.CHANNELS.value):
-            voicelist = channels[c][LCVALS.SL.value]
-            barstrs = []
-            comparison = ''
+            * LC bars are converted lazily, so that the whole song is not held as mml.
+            * 'SOUND' for mixing, 'PLAY' syntaxes and line numbers are added.
 
-            for b in range(len(voicelist)):
-                bar = voicelist[b][LCVALS.VL.value]
-                barstr = []
+        Yields:
+            str: Single line of playable MSX mml including line number and line feed
+        """
+        with self.profile.stage('lc2mml'):
+            self._mixer = self.mixer()
+            self.profile.mixer = self._mixer
 
-                for n in range(voicelist[b][LCVALS.PN.value]):
-                    note = bar[n]
+        yield from self._iter_emit(self._staged(self._source(self._extend)), self._extend)
 
-                    if note[LCVALS.LCVO.value]:
-                        macro, value, scale = self.num2macro(note[LCVALS.N.value])
+    def _staged(self, lines):
+        """Time the conversion of LC notes in the 'lc2mml' stage while streaming
 
-                        #Secure last octave level to save octave macro usage
-                        if macro == MMLVALS.OCTAVE.value:
-                            if value == comparison:
-                                macro = ''
-                                value = ''
-                            else:
-                                comparison = value
+            * Only taking each line from the source is timed, so that coupling, dedup and emission
+              of the consumer stay in the stage of the caller.
 
-                        barstr.append('{0}{1}{2}'.format(macro, value, scale))
+        Args:
+            lines: Iterable of MML strings of 3 channels
 
-                        #Evaluate single note for mixing register one by one as auto detection
-                        if note[LCVALS.ID.value] != None:
-                            if note[LCVALS.ID.value] in LCVALS.NOISEID.value:
-                                self._mixer &= ~nmask
-                            else:
-                                self._mixer &= ~smask
-                        
-                        #Separate mml by 8 notes because of MSX BASIC line constraints
-                        if n % MSXVALS.LINENOTES.value == MSXVALS.LINENOTES.value-1:
-                            barstrs.append(''.join(barstr))
-                            barstr.clear()
+        Returns:
+            Iterable of MML strings of 3 channels
+        """
+        if not self.profile.enabled:
+            return lines
+        return self._iter_staged(iter(lines))
 
-                if len(barstr) > 0:
-                    barstrs.append(''.join(barstr))
-                    barstr.clear()
+    def _iter_staged(self, lines):
+        """Generator taking each line from the iterator in the 'lc2mml' stage
 
-            smask <<= 1
-            nmask <<= 1
+        Args:
+            lines: Iterator of MML strings of 3 channels
 
-            self.notes.append(barstrs)
+        Yields:
+            tuple[str]: MML strings of 3 channels for single line
+        """
+        profile = self.profile
+        while True:
+            with profile.stage('lc2mml'):
+                strs = next(lines, None)
+            if strs is None:
+                return
+            yield strs
 
-    def generate(self):
-        """The series of conversion
+    @staticmethod
+    def _play(extend):
+        """'PLAY' syntax of the line
 
-            * Call conversion core function.
-            * 'SOUND' for mixing, 'PLAY' syntaxes and line numbers are added.
+        Args:
+            extend (bool): Use exnteded basic for play syntax
+
+        Returns:
+            str: 'PLAY' keyword with the device designation if extended
+        """
+        return 'PLAY#0,' if extend else 'PLAY'
+
+    def _source(self, extend):
+        """MSX MML strings of 3 channels by the line with the current table
 
         Args:
-            lcfile (str): The path of LovelyComposer source file
+            extend (bool): Use exnteded basic for play syntax
 
         Returns:
-            list[str]: Entire playable MSX mml as the conversion result
+            Iterable of MML strings of 3 channels
         """
-        self.mml.clear()
+        if self._pack:
+            #Definitions of dedup precede the notes, so that the widest line number is assumed
+            row = self._line + self._step * (3 if extend else 2)
+            return self.iter_packed(MSXVALS.MAXROW.value if self._dedup else row, self._play(extend))
+        return zip(*[self.iter_channel(c) for c in range(MSXVALS.CHANNELS.value)])
+
+    def _iter_emit(self, lines, extend):
+        """Generator of MSX basic lines from MSX MML strings of 3 channels
 
-        self.lc2mml()
+            * 'SOUND' for mixing by self._mixer, 'PLAY' syntaxes and line numbers are added.
+            * Coupling and dedup are applied if enabled.
 
+        Args:
+            lines: Iterable of MML strings of 3 channels
+            extend (bool): Use exnteded basic for play syntax
+
+        Yields:
+            str: Single line of playable MSX mml including line number and line feed
+        """
+        profile = self.profile
         row = self._line
 
-        #Append initial settings
-        if self._extend:
-            self.mml.append('{0} _MUSIC\n'.format(row))
+        #Yield initial settings
+        if extend:
+            yield '{0} _MUSIC\n'.format(row)
             row += self._step
-        self.mml.append('{0} SOUND7,&B{1}\n'.format(row, format(self._mixer, '06b')))
+        yield '{0} SOUND7,&B{1}\n'.format(row, format(self._mixer, '06b'))
         row += self._step
-        play = 'PLAY#0,' if self._extend else 'PLAY'
-        self.mml.append('{0} {1}\"T{2}V{3}L{4}\",\"T{2}V{3}L{4}\",\"T{2}V{3}L{4}\"\n'.format( \
-            row, play, self._tempo, self._volume, self._notelen))
+        play = self._play(extend)
+        yield '{0} {1}\"T{2}V{3}L{4}\",\"T{2}V{3}L{4}\",\"T{2}V{3}L{4}\"\n'.format( \
+            row, play, self._tempo, self._volume, self._notelen)
         row += self._step
 
-        #Append actual notes by sorting 1 bar from the list of 3 channels
-        _line = []
-        for n in range(len(self.notes[0])):
-            for m in range(MSXVALS.CHANNELS.value):
-                _line.append('\"{0}\"'.format(self.notes[m][n]))
-            self.mml.append('{0} {1}{2}\n'.format(row, play, ','.join(_line)))
-            _line.clear()
+        #Yield actual notes by sorting 1 bar from the list of 3 channels
+        self.savedbytes = 0
+        self.optimizedbytes = 0
+        if self._couple:
+            lines = self._iter_coupled(lines)
+        if self._optimize:
+            lines = self._optimized(lines, play)
+
+        names = {}
+        if self._dedup:
+            #Whole lines are held here because repetitions are known only after the last line
+            lines = list(lines)
+            names = self.dedup(lines)
+            for statement in self._iter_definitions(names, row):
+                yield '{0} {1}\n'.format(row, statement)
+                row += self._step
+
+        for strs in lines:
+            args = [names[mml] if mml in names else '"{0}"'.format(mml) for mml in strs]
+            profile.line(args)
+            yield '{0} {1}{2}\n'.format(row, play, ','.join(args))
             row += self._step
 
-        return self.mml
\ No newline at end of file
+    def generate_targets(self, targets=MSXVALS.TARGETS.value):
+        """Single pass conversion into several targets
+
+            * 'basic' is plain MSX basic, 'ext' is extended basic and 'nmacro' uses 'N' macro.
+              Configured parameters except of extend and nmacro apply to all targets.
+            * The mixer is detected once, and the note stream is walked once for all tables.
+              Channel strings of 'basic' and 'ext' are shared because they differ only in syntax.
+            * In case of packing or 'numpy' engine the channel strings are built by the table.
+
+        Args:
+            targets (list[str]): Target names in MSXVALS.TARGETS
+
+        Returns:
+            dict[str, list[str]]: Entire playable MSX mml by the target
+        """
+        for target in targets:
+            if target not in MSXVALS.TARGETS.value:
+                raise ValueError('Unknown target \'{0}\''.format(target))
+
+        with self.profile.stage('generate'):
+            with self.profile.stage('lc2mml'):
+                self._mixer = self.mixer()
+                self.profile.mixer = self._mixer
+
+            nmacros = sorted(set(target == 'nmacro' for target in targets))
+            sources = {}
+            if not self._pack and self._engine == 'python':
+                tables = [self._ntable if nmacro else self._otable for nmacro in nmacros]
+                with self.profile.stage('lc2mml'):
+                    channels = [list(self._iter_channel_tables(c, tables)) for c in range(MSXVALS.CHANNELS.value)]
+                for k, nmacro in enumerate(nmacros):
+                    sources[nmacro] = list(zip(*[[strs[k] for strs in lines] for lines in channels]))
+
+            results = {}
+            table = self._table
+            nmacro = self._nmacro
+            try:
+                for target in targets:
+                    extend = target == 'ext'
+                    self._nmacro = target == 'nmacro'
+                    self._table = self._ntable if self._nmacro else self._otable
+                    lines = sources[self._nmacro] if self._nmacro in sources else self._staged(self._source(extend))
+                    results[target] = list(self._iter_emit(lines, extend))
+            finally:
+                self._table = table
+                self._nmacro = nmacro
+
+        return results
+
+    def _iter_coupled(self, lines):
+        """Apply coupling to MSX MML strings of 3 channels by the line
+
+        Args:
+            lines: Iterable of MML strings of 3 channels
+
+        Yields:
+            list[str]: Coupled MML strings of 3 channels
+        """
+        for strs in lines:
+            coupled = [self.couple(mml) for mml in strs]
+            self.savedbytes += sum(len(a) - len(b) for a, b in zip(strs, coupled))
+            yield coupled
+
+    def _optimized(self, lines, play):
+        """Re-encode MSX MML strings of 3 channels into the shortest notation
+
+            * The octave and the default length are chained over the lines of each channel,
+              so that whole lines are held here.
+            * Lines are kept as is unless all re-encoded lines fit MSX basic line length,
+              or in case of the notation the optimizer does not support such as notes beyond 'O8'.
+
+        Args:
+            lines: Iterable of MML strings of 3 channels
+            play (str): 'PLAY' syntax of the line
+
+        Returns:
+            list: MML strings of 3 channels by the line
+        """
+        from .optimize import optimize_channel
+
+        lines = list(lines)
+        try:
+            channels = [optimize_channel([strs[c] for strs in lines], self._notelen) \
+                for c in range(MSXVALS.CHANNELS.value)]
+        except ValueError:
+            return lines
+        optimized = list(zip(*channels))
+
+        #Line number, space, 'PLAY', quotations and commas
+        fixed = len(str(MSXVALS.MAXROW.value)) + 1 + len(play) + 3 * MSXVALS.CHANNELS.value - 1
+        if any(fixed + sum(len(mml) for mml in strs) > MSXVALS.MAXLINE.value for strs in optimized):
+            return lines
+        self.optimizedbytes = sum(len(mml) for strs in lines for mml in strs) - \
+            sum(len(mml) for strs in optimized for mml in strs)
+        return optimized
+
+    @staticmethod
+    def _iter_names():
+        """Generator of string variable names
+
+        Yields:
+            str: Single or double letter string variable name
+        """
+        letters = [chr(c) for c in range(ord('A'), ord('Z')+1)]
+        for a in letters:
+            yield a + '$'
+        for a in letters:
+            for b in letters:
+                if a + b not in MSXVALS.RESERVED.value:
+                    yield a + b + '$'
+
+    def dedup(self, lines):
+        """Choose repeated MML strings to be shared by string variables
+
+            * Each channel string is counted across the song by its hash.
+            * The string takes a variable only if its references save more bytes
+              than its definition costs, and the most saving ones take the shortest names.
+
+        Args:
+            lines (list): MML strings of 3 channels by the line
+
+        Returns:
+            dict[str, str]: Variable name by the shared MML string
+        """
+        counts = {}
+        for strs in lines:
+            for mml in strs:
+                counts[mml] = counts.get(mml, 0) + 1
+
+        #Definition shall fit single line by itself
+        limit = MSXVALS.MAXLINE.value - len(str(MSXVALS.MAXROW.value)) - 1
+        candidates = sorted(((len(mml) + 2) * count, mml) \
+            for mml, count in counts.items() if count > 1 and len(mml) + 6 <= limit)
+        candidates.reverse()
+
+        names = {}
+        variables = self._iter_names()
+        name = next(variables)
+        for gain, mml in candidates:
+            #References by the name, against its definition with '=', quotations and separator
+            saving = gain - counts[mml] * len(name) - (len(name) + len(mml) + 4)
+            if saving > 0:
+                names[mml] = name
+                name = next(variables, None)
+                if name is None:
+                    break
+
+        self.dedupnames = names
+        self.dedupcount = (sum(counts[mml] for mml in names), sum(counts.values()))
+        return names
+
+    def _iter_definitions(self, names, row):
+        """Generator of statements defining shared string variables
+
+        Args:
+            names (dict[str, str]): Variable name by the shared MML string
+            row (int): Line number of the first definition line
+
+        Yields:
+            str: Statements of single line up to MSX basic line length
+        """
+        statement = ''
+        for mml, name in names.items():
+            definition = '{0}="{1}"'.format(name, mml)
+            if statement and len(str(row)) + 2 + len(statement) + len(definition) > MSXVALS.MAXLINE.value:
+                yield statement
+                row += self._step
+                statement = ''
+            statement = statement + ':' + definition if statement else definition
+        if statement:
+            yield statement
+
+    def write(self, fp, bufsize=256):
+        """Streaming conversion written to the file object
+
+            Lines are written by the bulk of bufsize lines.
+
+        Args:
+            fp: Writable text file object
+            bufsize (int): Number of lines written at once
+
+        Returns:
+            int: Number of written characters
+        """
+        profile = self.profile
+        written = 0
+        buf = []
+        with profile.stage('generate'):
+            for line in self.iter_lines():
+                buf.append(line)
+                if len(buf) >= bufsize:
+                    with profile.stage('write'):
+                        written += fp.write(''.join(buf))
+                    buf.clear()
+            if len(buf) > 0:
+                with profile.stage('write'):
+                    written += fp.write(''.join(buf))
+        return written
+
+    def generate(self):
+        """The series of conversion
+
+            * Thin wrapper of iter_lines() keeping the result in self.mml.
+            * 'SOUND' for mixing, 'PLAY' syntaxes and line numbers are added.
+
+        Returns:
+            list[str]: Entire playable MSX mml as the conversion result
+        """
+        with self.profile.stage('generate'):
+            self.mml.clear()
+            self.mml.extend(self.iter_lines())
+
+        return self.mml
+
+def convert(song, options=Options(), profile=None):
+    """Reentrant conversion of the song without shared state
+
+        * Every call works on its own converter, so that concurrent calls on threads
+          or asyncio tasks never interfere with each other.
+        * The song is only read, and can be shared by the calls.
+
+    Args:
+        song (Song): Compact song representation
+        options (Options): Conversion parameters
+        profile (Profile): Profile accumulating timers and counters (None: not instrumented)
+
+    Returns:
+        Result: Lines, mixer value and statistics of the conversion
+    """
+    mb = Basic()
+    mb.configure(**options._asdict())
+    mb.song = song
+    if profile is not None:
+        mb.instrument(profile)
+    with mb.profile.stage('generate'):
+        lines = tuple(mb.iter_lines())
+    references, strings = mb.dedupcount
+    stats = Stats(savedbytes=mb.savedbytes, optimizedbytes=mb.optimizedbytes, references=references, strings=strings, names=tuple(mb.dedupnames.items()))
+    return Result(lines=lines, mixer=mb._mixer, stats=stats)
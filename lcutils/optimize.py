@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Size-optimal MSX mml encoding module
+
+    Re-encodes the MML strings of single channel into the shortest equivalent ones.
+    The default length of each line is chosen by the dynamic programming over the lines,
+    and then each note is encoded by absolute octave 'O', relative octave '<' '>' or 'N' macro
+    by the dynamic programming over the octave state of the note stream.
+
+   Constraints:
+    * Every note and rest keeps its pitch and its length notation, so that the result plays identically.
+    * The octave is unknown at the beginning.
+    * 'N' macro counts from 'N1' for 'O1C' to 'N96' for 'O8B' as MSX does, and 'N0' is the rest.
+    * 'N' macro takes no length, so that it is used only for the note of the default length.
+    * Notes beyond 'O8' are not supported, and the caller keeps such strings as is.
+"""
+
+import re
+from .msxmml import MMLVALS
+
+_TOKEN = re.compile(r'L(\d+)|O(\d+)|(<)|(>)|N(\d+)|([A-G][+#]?)(\d*\.*)|R(\d*\.*)')
+_SCALEINDEX = dict((s, i) for i, s in enumerate(MMLVALS.SCALES.value[:MMLVALS.NUMSCALE.value]))
+_OCTAVES = 8
+_INF = float('inf')
+
+def _decode(lines, notelen):
+    """Decode MML strings of single channel into notes
+
+    Args:
+        lines (list[str]): MML strings of the channel by the line
+        notelen (int): Default length at the beginning
+
+    Returns:
+        list[list[tuple]]: Pitch (semitones from 'O1C', None for the rest) and length notation by the note of each line
+
+    Raises:
+        ValueError: The string contains unsupported notation
+    """
+    numscale = MMLVALS.NUMSCALE.value
+    highest = _OCTAVES * numscale
+    deflen = str(notelen)
+    octave = 0
+    result = []
+
+    for mml in lines:
+        notes = []
+        pos = 0
+        for m in _TOKEN.finditer(mml):
+            if m.start() != pos:
+                break
+            pos = m.end()
+            length, level, down, up, number, scale, scalelen, restlen = m.groups()
+            if length is not None:
+                deflen = length
+            elif level is not None:
+                octave = int(level)
+            elif down is not None:
+                octave -= 1
+            elif up is not None:
+                octave += 1
+            elif number is not None:
+                pitch = int(number) - 1
+                if pitch >= highest:
+                    raise ValueError('Note beyond O{0} in \'{1}\''.format(_OCTAVES, mml))
+                notes.append((pitch if pitch >= 0 else None, deflen))
+            elif scale is not None:
+                if octave < 1:
+                    raise ValueError('Note without octave in \'{0}\''.format(mml))
+                pitch = (octave - 1) * numscale + _SCALEINDEX[scale.replace('#', '+')]
+                if pitch >= highest:
+                    raise ValueError('Note beyond O{0} in \'{1}\''.format(_OCTAVES, mml))
+                notes.append((pitch, scalelen if scalelen else deflen))
+            else:
+                notes.append((None, restlen if restlen else deflen))
+        if pos != len(mml):
+            raise ValueError('Unsupported notation in \'{0}\''.format(mml))
+        result.append(notes)
+
+    return result
+
+def _lengths(notes, notelen):
+    """Choose the default length of each line
+
+    Args:
+        notes (list[list[tuple]]): Decoded notes by the line
+        notelen (int): Default length at the beginning
+
+    Returns:
+        list[str]: Default length by the line
+    """
+    #Cost and the default length of the previous line by the default length
+    costs = {str(notelen): 0}
+    backs = []
+    for line in notes:
+        lengths = [length for pitch, length in line]
+        candidates = set(costs) | set(l for l in lengths if l.isdigit())
+        newcosts = {}
+        back = {}
+        for x in candidates:
+            body = sum(len(l) for l in lengths if l != x)
+            prev = min(costs, key=lambda p: costs[p] + (0 if p == x else 1 + len(x)))
+            newcosts[x] = costs[prev] + (0 if prev == x else 1 + len(x)) + body
+            back[x] = prev
+        costs = newcosts
+        backs.append(back)
+
+    x = min(sorted(costs), key=lambda p: costs[p])
+    result = []
+    for back in reversed(backs):
+        result.append(x)
+        x = back[x]
+    result.reverse()
+    return result
+
+def _octaves(notes, deflens):
+    """Choose the encoding of each note by the octave state
+
+    Args:
+        notes (list[list[tuple]]): Decoded notes by the line
+        deflens (list[str]): Default length by the line
+
+    Returns:
+        list[list[str]]: MML token by the note of each line
+    """
+    numscale = MMLVALS.NUMSCALE.value
+    scales = MMLVALS.SCALES.value
+    rest = MMLVALS.REST.value
+    octave = MMLVALS.OCTAVE.value
+
+    #Cost by the octave state, 0 for unknown
+    costs = [0] + [_INF] * _OCTAVES
+    #The octave reached by the octave route with its previous state and prefix by the note,
+    #other states are reached by 'N' macro keeping the state
+    steps = []
+    for line, deflen in zip(notes, deflens):
+        for pitch, length in line:
+            part = '' if length == deflen else length
+            if pitch is None:
+                steps.append(None)
+                continue
+
+            #Absolute or relative octave, or none in case of the same octave
+            o = pitch // numscale + 1
+            cost = costs[o]
+            prev = o
+            prefix = ''
+            if o < _OCTAVES and costs[o + 1] + 1 < cost:
+                cost = costs[o + 1] + 1
+                prev = o + 1
+                prefix = '<'
+            if o > 1 and costs[o - 1] + 1 < cost:
+                cost = costs[o - 1] + 1
+                prev = o - 1
+                prefix = '>'
+            lowest = min(costs)
+            if lowest + 1 + len(str(o)) < cost:
+                cost = lowest + 1 + len(str(o))
+                prev = costs.index(lowest)
+                prefix = octave + str(o)
+            cost += len(scales[pitch % numscale]) + len(part)
+
+            #'N' macro counts from 1 for 'O1C'
+            if part == '':
+                ncost = 1 + len(str(pitch + 1))
+                costs = [c + ncost for c in costs]
+            else:
+                costs = [_INF] * len(costs)
+            if cost < costs[o]:
+                costs[o] = cost
+                steps.append((o, prev, prefix))
+            else:
+                steps.append((o, o, 'N'))
+
+    #Trace back from the cheapest final state
+    state = costs.index(min(costs))
+    choices = []
+    for step in reversed(steps):
+        if step is None:
+            choices.append(None)
+            continue
+        o, prev, prefix = step
+        if state == o and prefix != 'N':
+            choices.append((o, prefix))
+            state = prev
+        else:
+            choices.append('N')
+    choices.reverse()
+
+    result = []
+    k = 0
+    for line, deflen in zip(notes, deflens):
+        tokens = []
+        for pitch, length in line:
+            part = '' if length == deflen else length
+            choice = choices[k]
+            k += 1
+            if choice is None:
+                tokens.append(rest + part)
+            elif choice == 'N':
+                tokens.append(MMLVALS.LEVEL.value + str(pitch + 1))
+            else:
+                tokens.append(choice[1] + scales[pitch % numscale] + part)
+        result.append(tokens)
+    return result
+
+def optimize_channel(lines, notelen):
+    """Shortest equivalent MML strings of single channel
+
+    Args:
+        lines (list[str]): MML strings of the channel by the line
+        notelen (int): Default length at the beginning
+
+    Returns:
+        list[str]: Re-encoded MML strings by the line
+
+    Raises:
+        ValueError: The string contains unsupported notation
+    """
+    notes = _decode(lines, notelen)
+    deflens = _lengths(notes, notelen)
+    tokens = _octaves(notes, deflens)
+
+    result = []
+    current = str(notelen)
+    for line, deflen in zip(tokens, deflens):
+        prefix = ''
+        if deflen != current:
+            prefix = 'L' + deflen
+            current = deflen
+        result.append(prefix + ''.join(line))
+    return result
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""PSG audio preview module of MSX mml conversion
+
+    Synthesizes three AY-3-8910 square and noise channels from the converted song
+    into mono WAV, so that the conversion can be heard without MSX emulator.
+    Samples are made by NumPy block operations over fixed-size sample blocks, and the tone phase
+    of each channel is carried over the blocks, so that long songs are written in bounded memory.
+
+   Constraints:
+    * Each voiced step takes 240 / (tempo * notelen) seconds as 'PLAY' does, and the steps
+      without LC voice take no time because they are not written to MSX basic.
+    * Tone and noise of each channel follow the mixer value of Basic.mixer(),
+      and every note sounds in the volume setting for its whole length.
+    * Noise period of the register 6 is fixed to NOISEPERIOD, because the converter does not set it.
+
+    NumPy is optional; available() tells whether the preview can be rendered.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import wave
+from .msxmml import LCVALS
+from .msxmml import MSXVALS
+from .msxmml import Song
+
+PSGCLOCK = 1789772.5
+NOISEPERIOD = 16
+DEFRATE = 44100
+BLOCKSAMPLES = 65536
+GAIN = 0.8
+
+#Noise generator sequence, made on the first rendering
+_noise = None
+
+def available():
+    """Whether NumPy is installed
+
+    Returns:
+        bool: True if the preview can be rendered
+    """
+    return np is not None
+
+def _noisetable():
+    """Output sequence of 17 bit noise generator
+
+    Returns:
+        ndarray: Output bits of single cycle
+    """
+    global _noise
+    if _noise is None:
+        bits = bytearray(2 ** 17 - 1)
+        lfsr = 1
+        for i in range(len(bits)):
+            bits[i] = lfsr & 1
+            lfsr = (lfsr >> 1) | (((lfsr ^ (lfsr >> 3)) & 1) << 16)
+        _noise = np.frombuffer(bytes(bits), dtype=np.uint8).astype(bool)
+    return _noise
+
+def _frequencies():
+    """Tone frequencies by LC 'n' item quantized by 12 bit tone period
+
+    Returns:
+        ndarray: Frequency by LC 'n' item up to the highest MSX octave, 0 for the last element
+    """
+    nums = np.arange(LCVALS.MINNUM.value + 8 * 12)
+    periods = np.clip(np.rint(PSGCLOCK / (16 * 440.0 * 2 ** ((nums - 69) / 12))), 1, 4095)
+    return np.append(PSGCLOCK / (16 * periods), 0.0)
+
+def _amplitude(volume):
+    """Output level of the volume register
+
+    Args:
+        volume (int): Volume 0-15
+
+    Returns:
+        float: Level from 0 to 1, 3dB by the volume step
+    """
+    return 0.0 if volume <= 0 else 2 ** ((min(volume, 15) - 15) / 2)
+
+class _Channel:
+    """Rendering state of single channel carried over the sample blocks
+    """
+    def __init__(self, ch, stepsamples, freqs, tone, noise):
+        """Initialization
+
+        Args:
+            ch (Channel): Compact notes of the channel
+            stepsamples (float): Samples of single step
+            freqs (ndarray): Frequencies by LC 'n' item
+            tone (bool): Tone is enabled by the mixer
+            noise (bool): Noise is enabled by the mixer
+        """
+        voices = np.frombuffer(ch.voices, dtype=np.int8).astype(bool)
+        notes = np.frombuffer(ch.notes, dtype=np.int16)[voices].astype(np.int64)
+        self.rests = notes == Song.REST
+        notes[self.rests | (notes >= len(freqs) - 1)] = len(freqs) - 1
+        self.freqs = freqs[notes]
+        self.edges = np.rint(np.arange(len(notes) + 1) * stepsamples).astype(np.int64)
+        self.tone = tone
+        self.noise = noise
+        self.phase = 0.0
+
+    def end(self):
+        """Number of samples of the channel
+
+        Returns:
+            int: Sample position where the last step ends
+        """
+        return int(self.edges[-1])
+
+    def add(self, out, first, rate, level):
+        """Add the samples of the block
+
+        Args:
+            out (ndarray): Output samples of the block to be added
+            first (int): Sample position of the block
+            rate (int): Sampling rate
+            level (float): Output level of notes
+        """
+        last = first + len(out)
+        start = int(np.searchsorted(self.edges, first, side='right')) - 1
+        stop = min(int(np.searchsorted(self.edges, last, side='left')), len(self.edges) - 1)
+        if start >= stop:
+            return
+        counts = np.diff(np.clip(self.edges[start:stop+1], first, last))
+        index = np.repeat(np.arange(start, stop), counts)
+
+        #Tone flip-flop by the phase accumulated over the samples, high while disabled
+        high = np.ones(len(index), dtype=bool)
+        if self.tone:
+            phases = self.phase + np.cumsum(self.freqs[index] / rate)
+            self.phase = phases[-1] % 1.0
+            high &= (phases % 1.0) < 0.5
+        if self.noise:
+            noisetable = _noisetable()
+            positions = (np.arange(first, first + len(index)) * (PSGCLOCK / (16 * NOISEPERIOD) / rate)).astype(np.int64)
+            high &= noisetable[positions % len(noisetable)]
+
+        samples = np.where(high, level, -level)
+        samples[self.rests[index]] = 0.0
+        out[:len(index)] += samples
+
+def iter_blocks(mb, rate=DEFRATE):
+    """Render the converted song into PSG samples block by block
+
+    Args:
+        mb (Basic): Basic instance whose song has been read and configured
+        rate (int): Sampling rate
+
+    Yields:
+        ndarray: Mono 16 bit samples of BLOCKSAMPLES at most
+
+    Raises:
+        ImportError: NumPy is not installed
+    """
+    if np is None:
+        raise ImportError('NumPy is required for the preview')
+
+    options = mb.options()
+    mixer = mb.mixer()
+    stepsamples = rate * 240.0 / (options.tempo * options.notelen)
+    freqs = _frequencies()
+    level = _amplitude(options.volume) * GAIN * 32767 / MSXVALS.CHANNELS.value
+
+    channels = []
+    for c, ch in enumerate(mb.song.channels):
+        tone = not mixer & (MSXVALS.SMASK.value << c)
+        noise = not mixer & (MSXVALS.NMASK.value << c)
+        channels.append(_Channel(ch, stepsamples, freqs, tone, noise))
+
+    total = max(channel.end() for channel in channels)
+    for first in range(0, total, BLOCKSAMPLES):
+        out = np.zeros(min(BLOCKSAMPLES, total - first), dtype=np.float64)
+        for channel in channels:
+            channel.add(out, first, rate, level)
+        yield out.astype(np.int16)
+
+def render(mb, rate=DEFRATE):
+    """Render the converted song into PSG samples
+
+    Args:
+        mb (Basic): Basic instance whose song has been read and configured
+        rate (int): Sampling rate
+
+    Returns:
+        ndarray: Mono 16 bit samples
+
+    Raises:
+        ImportError: NumPy is not installed
+    """
+    blocks = list(iter_blocks(mb, rate))
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int16)
+
+def write(path, mb, rate=DEFRATE):
+    """Write the preview of the converted song to WAV file block by block
+
+    Args:
+        path (str): The path of WAV file
+        mb (Basic): Basic instance whose song has been read and configured
+        rate (int): Sampling rate
+
+    Returns:
+        float: Seconds of the preview
+
+    Raises:
+        ImportError: NumPy is not installed
+    """
+    frames = 0
+    with wave.open(path, 'wb') as f_out:
+        f_out.setnchannels(1)
+        f_out.setsampwidth(2)
+        f_out.setframerate(rate)
+        for samples in iter_blocks(mb, rate):
+            f_out.writeframes(samples.tobytes())
+            frames += len(samples)
+    return frames / rate
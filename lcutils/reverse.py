@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Reverse conversion module from MSX basic mml to LovelyComposer jsonl
+
+    Reads ASCII MSX basic made by this converter or by hand line by line, scans 'PLAY' strings
+    by single compiled pattern, and rebuilds LovelyComposer channels, bars and voices.
+    Bars are spooled to temporary files by the channel, so that very large programs
+    are converted in bounded memory.
+
+   Constraints:
+    * Each 'PLAY' statement becomes single bar of each channel, padded by the steps without voice
+      to the longest channel of the statement. Bars longer than 8 notes take the step without voice
+      at the end of every 8 notes, and bars longer than LC play notes are divided.
+    * A step takes the first 'L', which is in the header line made by this converter,
+      or the length of the first note if it comes earlier.
+      Longer notes are followed by rests, and shorter notes are rounded to single step.
+    * Octave and length start from MSX defaults 'O4' and 'L4', and continue across the statements.
+    * Tempo, volume, envelope and tone are not reflected to the song but reported.
+    * Tone IDs are chosen by 'SOUND 7' mixer value, so that the mixer is detected again as is.
+    * Conversion by this converter is reproduced by the reversed song with the same options,
+      except for the rest coupled over the steps without LC voice in packed lines.
+"""
+
+import re
+import json
+import tempfile
+from abc import ABC
+from abc import abstractmethod
+from fractions import Fraction
+from .msxmml import MMLVALS
+from .msxmml import LCVALS
+from .msxmml import MSXVALS
+
+HEADER = 'lc2msxmml reverse conversion'
+MAXPLAYNOTES = 32
+MSXOCTAVE = 4
+MSXLEN = '4'
+TONEID = 1
+
+_MML = re.compile(r'([A-GR])([+#-]?)(\d*)(\.*)|([TVLON])(\d+)|([<>])|[MS]\d*|\s+')
+_STATEMENT = re.compile(r'\s*(?:(_MUSIC)|SOUND\s*7\s*,\s*&B([01]+)|PLAY\s*(#\d+\s*,)?(.*)|([A-Z][A-Z0-9]?\$)\s*=\s*"([^"]*)"?)\s*$', re.I)
+_ARGUMENT = re.compile(r'\s*(?:"([^"]*)"?|([A-Z][A-Z0-9]?\$)|)\s*$', re.I)
+_SCALEINDEX = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+
+def _split(text, separator):
+    """Split the text by the separator outside of string literals
+
+    Args:
+        text (str): Text of MSX basic
+        separator (str): Single separator character
+
+    Returns:
+        list[str]: Separated texts
+    """
+    pieces = text.split(separator)
+    if '"' not in text:
+        return pieces
+    #Pieces are joined again while the string literal is open
+    parts = []
+    for piece in pieces:
+        if parts and parts[-1].count('"') % 2:
+            parts[-1] += separator + piece
+        else:
+            parts.append(piece)
+    return parts
+
+class Reader(ABC):
+    """Statement reader of MSX basic program, which passes each 'PLAY' statement to play()
+
+        Handles '_MUSIC', 'SOUND 7', string variable definitions and 'PLAY' arguments referring them,
+        and ignores other statements.
+
+    Args:
+        extend (bool): Extended basic is used
+        mixer (int): 'SOUND 7' value (None: not found)
+        row (int): Line number of the line being read (None: not numbered)
+    """
+    def __init__(self):
+        """Initialization
+        """
+        self.extend = False
+        self.mixer = None
+        self.row = None
+        self._variables = {}
+
+    @abstractmethod
+    def play(self, args):
+        """Process single 'PLAY' statement, implemented by the subclass
+
+        Args:
+            args (list[str]): MML string by the channel
+        """
+
+    def statement(self, text):
+        """Read single statement of MSX basic
+
+        Args:
+            text (str): Statement without the line number
+        """
+        m = _STATEMENT.match(text)
+        if m is None:
+            return
+        music, mixer, device, args, name, value = m.groups()
+        if music is not None:
+            self.extend = True
+        elif mixer is not None:
+            self.mixer = int(mixer, 2)
+        elif args is not None:
+            strs = []
+            for arg in _split(args, ','):
+                a = _ARGUMENT.match(arg)
+                if a is None:
+                    raise ValueError('Unsupported \'PLAY\' argument \'{0}\''.format(arg))
+                literal, variable = a.groups()
+                strs.append(literal if literal is not None else self._variables.get(variable.upper(), '') if variable else '')
+            if device is not None:
+                self.extend = True
+            self.play(strs)
+        elif name is not None:
+            self._variables[name.upper()] = value
+
+    def line(self, text):
+        """Read single line of MSX basic
+
+        Args:
+            text (str): Line of ASCII MSX basic with the line number
+        """
+        text = text.strip()
+        body = text.lstrip('0123456789')
+        number = text[:len(text)-len(body)]
+        self.row = int(number) if number else None
+        for statement in _split(body, ':'):
+            self.statement(statement)
+
+class Reverse(Reader):
+    """Streaming reverse converter of single MSX basic program
+
+    Args:
+        notelen (int): Length taken as single step (None: the first 'L' or the length of the first note)
+        tempo (int): 'T' found first (None: not found)
+        volume (int): 'V' found first (None: not found)
+        bars (int): Number of 'PLAY' statements converted
+    """
+    def __init__(self, notelen=None):
+        """Initialization
+
+        Args:
+            notelen (int): Length taken as single step (None: the first 'L' or the length of the first note)
+        """
+        super().__init__()
+        self.notelen = notelen
+        self.tempo = None
+        self.volume = None
+        self.bars = 0
+        self._durations = {}
+        self._octaves = [MSXOCTAVE] * MSXVALS.CHANNELS.value
+        self._lengths = [MSXLEN] * MSXVALS.CHANNELS.value
+        self._ids = [None] * MSXVALS.CHANNELS.value
+        self._spools = [tempfile.TemporaryFile('w+', encoding='utf-8') for c in range(MSXVALS.CHANNELS.value)]
+
+    def close(self):
+        """Release the spool files
+        """
+        for spool in self._spools:
+            spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _steps(self, length, dots):
+        """Number of steps the note takes
+
+        Args:
+            length (str): Length notation
+            dots (str): Dots of the length
+
+        Returns:
+            int: Number of steps, at least one
+        """
+        key = (length, dots)
+        steps = self._durations.get(key)
+        if steps is None:
+            duration = Fraction(self.notelen, int(length)) * (2 - Fraction(1, 2 ** len(dots)))
+            steps = self._durations[key] = max(1, round(duration))
+        return steps
+
+    def scan(self, channel, mml):
+        """Scan MML string of single channel into LC notes
+
+        Args:
+            channel (int): PSG channel number from 0
+            mml (str): MML string of 'PLAY' argument
+
+        Returns:
+            list[int]: LC 'n' item by the step, None for the rest
+
+        Raises:
+            ValueError: The string contains unsupported notation
+        """
+        notes = []
+        octave = self._octaves[channel]
+        length = self._lengths[channel]
+        numscale = MMLVALS.NUMSCALE.value
+        minnum = LCVALS.MINNUM.value
+        pos = 0
+        mml = mml.upper()
+
+        for m in _MML.finditer(mml):
+            if m.start() != pos:
+                break
+            pos = m.end()
+            scale, accidental, notelen, dots, macro, value, shift = m.groups()
+            if scale is not None:
+                if self.notelen is None:
+                    self.notelen = int(notelen if notelen else length)
+                if scale == 'R':
+                    notes.append(None)
+                else:
+                    index = _SCALEINDEX[scale] + (1 if accidental in ('+', '#') else -1 if accidental == '-' else 0)
+                    notes.append((octave - 1) * numscale + index + minnum)
+                notes.extend([None] * (self._steps(notelen if notelen else length, dots) - 1))
+            elif macro == 'O':
+                octave = int(value)
+            elif macro == 'L':
+                length = value
+                if self.notelen is None:
+                    self.notelen = int(value)
+            elif macro == 'N':
+                if self.notelen is None:
+                    self.notelen = int(length)
+                number = int(value)
+                notes.append(number - 1 + minnum if number > 0 else None)
+                notes.extend([None] * (self._steps(length, '') - 1))
+            elif macro == 'T':
+                if self.tempo is None:
+                    self.tempo = int(value)
+            elif macro == 'V':
+                if self.volume is None:
+                    self.volume = int(value)
+            elif shift is not None:
+                octave += 1 if shift == '>' else -1
+        if pos != len(mml):
+            raise ValueError('Unsupported notation at \'{0}\''.format(mml[pos:]))
+
+        self._octaves[channel] = octave
+        self._lengths[channel] = length
+        return notes
+
+    def _tones(self):
+        """Tone IDs by the channel as the mixer value designates
+
+        Returns:
+            list[tuple]: ID of the first note and ID of the others by the channel
+        """
+        mixer = MSXVALS.ALLMASK.value if self.mixer is None else self.mixer
+        noise = LCVALS.NOISEID.value[0]
+        result = []
+        for c in range(MSXVALS.CHANNELS.value):
+            tone = not mixer & (MSXVALS.SMASK.value << c)
+            isnoise = not mixer & (MSXVALS.NMASK.value << c)
+            if tone and isnoise:
+                result.append((noise, TONEID))
+            elif isnoise:
+                result.append((noise, noise))
+            elif tone:
+                result.append((TONEID, TONEID))
+            else:
+                result.append((None, None))
+        return result
+
+    def play(self, args):
+        """Convert single 'PLAY' statement into single bar of each channel
+
+        Args:
+            args (list[str]): MML string by the channel
+        """
+        channels = [self.scan(c, mml) for c, mml in enumerate(args[:MSXVALS.CHANNELS.value])]
+        channels.extend([] for c in range(MSXVALS.CHANNELS.value - len(channels)))
+        steps = max(len(notes) for notes in channels)
+        if steps == 0:
+            return
+
+        tones = self._tones()
+        lcvo = LCVALS.LCVO.value
+        lcid = LCVALS.ID.value
+        lcn = LCVALS.N.value
+        linenotes = MSXVALS.LINENOTES.value
+        rest = {lcvo: True, lcid: None, lcn: None}
+        absent = {lcvo: None, lcid: None, lcn: None}
+        for c, notes in enumerate(channels):
+            first, other = tones[c]
+            vl = []
+            for n in notes:
+                if n is None:
+                    vl.append(rest)
+                else:
+                    vl.append({lcvo: True, lcid: other if self._ids[c] else first, lcn: n})
+                    self._ids[c] = True
+            vl.extend([absent] * (steps - len(notes)))
+            #The step without voice at the end of every 8 notes keeps the statement in single line
+            i = linenotes - 1
+            while i < len(vl) - 1:
+                vl.insert(i, absent)
+                i += linenotes
+            for start in range(0, len(vl), MAXPLAYNOTES):
+                chunk = vl[start:start+MAXPLAYNOTES]
+                self._spools[c].write((',' if self.bars or start else '') + \
+                    json.dumps({LCVALS.PN.value: len(chunk), LCVALS.VL.value: chunk}))
+        self.bars += 1
+
+    def write(self, fp):
+        """Write LovelyComposer jsonl with the header line
+
+        Args:
+            fp: Writable text file object
+        """
+        fp.write(HEADER + '\n')
+        fp.write('{{"{0}": {{"{0}": ['.format(LCVALS.CH.value))
+        for c, spool in enumerate(self._spools):
+            fp.write('{0}{{"{1}": ['.format(',' if c else '', LCVALS.SL.value))
+            spool.seek(0)
+            while True:
+                data = spool.read(65536)
+                if not data:
+                    break
+                fp.write(data)
+            fp.write(']}')
+        fp.write(']}}\n')
+
+    def settings(self):
+        """Conversion parameters found in the program
+
+        Returns:
+            dict: Keyword arguments for Basic.configure()
+        """
+        return dict(notelen = self.notelen if self.notelen else MSXVALS.DEFLEN.value, \
+            tempo = self.tempo if self.tempo else MSXVALS.DEFTEMPO.value, \
+            volume = self.volume if self.volume is not None else MSXVALS.DEFVOLUME.value, \
+            extend = self.extend)
+
+def bas2lc(basfp, lcfp, notelen=None):
+    """Streaming reverse conversion from ASCII MSX basic to LovelyComposer jsonl
+
+    Args:
+        basfp: Readable text file object of ASCII MSX basic
+        lcfp: Writable text file object for LovelyComposer jsonl
+        notelen (int): Length taken as single step (None: the first 'L' or the length of the first note)
+
+    Returns:
+        dict: Conversion parameters found in the program
+    """
+    with Reverse(notelen) as rv:
+        for number, text in enumerate(basfp, 1):
+            try:
+                rv.line(text)
+            except ValueError as e:
+                raise ValueError('Line {0}: {1}'.format(number, e)) from None
+        rv.write(lcfp)
+        return rv.settings()
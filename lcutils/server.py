@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""MSX mml conversion daemon module
+
+    Long-running localhost HTTP server built with asyncio, and its thin client.
+    Requests are dispatched to the warm pool of worker processes which have already
+    loaded lcutils, so that each conversion does not pay Python and module startup.
+
+    Protocol:
+        POST /convert with JSON body
+            {"lcjsonl": LovelyComposer jsonl text,
+             "options": keyword arguments for Basic.configure(),
+             "format": "ascii" or "binary"}
+        returns MSX basic as the body with status 200, or the error message with status 400.
+        GET /ping returns the converter version.
+"""
+
+from . import __version__
+from .msxmml import Basic
+from .msxmml import Options
+from .msxmml import convert
+
+DEFHOST = '127.0.0.1'
+DEFPORT = 8765
+ENVSERVER = 'LC2MSXMML_SERVER'
+MAXBODY = 16 * 1024 * 1024
+
+def parse_address(address):
+    """Separate the server address into the host and the port
+
+    Args:
+        address (str): 'HOST:PORT', 'HOST' or ':PORT' (None: default address)
+
+    Returns:
+        tuple: host (str) and port (int)
+    """
+    if not address:
+        return DEFHOST, DEFPORT
+    host, sep, port = address.rpartition(':')
+    if not sep:
+        return address, DEFPORT
+    return host if host else DEFHOST, int(port)
+
+def convert_text(lctext, config, binary=False):
+    """Convert LovelyComposer jsonl text on the worker process
+
+    Args:
+        lctext (str): The whole content of LovelyComposer source file
+        config (dict): Keyword arguments for Basic.configure()
+        binary (bool): Return tokenized binary basic instead of ASCII text
+
+    Returns:
+        bytes: MSX basic file content
+    """
+    mb = Basic()
+    mb.configure(**config)
+    mb.loads(lctext)
+    lines = convert(mb.song, mb.options()).lines
+    if binary:
+        from .msxbas import tokenize
+        return tokenize(lines)
+    return ''.join(lines).encode('ascii')
+
+def _warm():
+    """Make the worker process ready by single tiny conversion
+
+    Returns:
+        int: Process ID of the worker
+    """
+    import os
+    Basic().generate()
+    return os.getpid()
+
+async def _respond(writer, status, body, ctype='text/plain; charset=utf-8'):
+    """Write single HTTP response and close the connection
+
+    Args:
+        writer (asyncio.StreamWriter): Connection to the client
+        status (int): HTTP status code
+        body (bytes): Response body
+        ctype (str): Content type of the body
+    """
+    reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+    head = 'HTTP/1.1 {0} {1}\r\nContent-Type: {2}\r\nContent-Length: {3}\r\nConnection: close\r\n\r\n'.format( \
+        status, reasons[status], ctype, len(body))
+    writer.write(head.encode('ascii') + body)
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def _handle(reader, writer, pool):
+    """Serve single HTTP request
+
+    Args:
+        reader (asyncio.StreamReader): Connection from the client
+        writer (asyncio.StreamWriter): Connection to the client
+        pool (ProcessPoolExecutor): Warm worker pool
+    """
+    import json
+    import asyncio
+    from concurrent.futures import BrokenExecutor
+    try:
+        method, path, version = (await reader.readline()).decode('latin-1').split()
+        length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, sep, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+    except (ValueError, ConnectionError):
+        writer.close()
+        return
+
+    if method == 'GET' and path == '/ping':
+        await _respond(writer, 200, 'lc2msxmml {0}'.format(__version__).encode('ascii'))
+        return
+    if method != 'POST' or path != '/convert':
+        await _respond(writer, 404, b'Not found')
+        return
+    if length > MAXBODY:
+        await _respond(writer, 413, b'Request body too large')
+        return
+
+    try:
+        request = json.loads(await reader.readexactly(length))
+        binary = request.get('format', 'ascii') == 'binary'
+        config = Options(**request.get('options', {}))._asdict()
+        lctext = request['lcjsonl']
+    except Exception as e:
+        await _respond(writer, 400, '{0}: {1}'.format(type(e).__name__, e).encode('utf-8'))
+        return
+
+    loop = asyncio.get_running_loop()
+    try:
+        body = await loop.run_in_executor(pool, convert_text, lctext, config, binary)
+    except BrokenExecutor as e:
+        #Worker process itself has been lost
+        await _respond(writer, 500, '{0}: {1}'.format(type(e).__name__, e).encode('utf-8'))
+        return
+    except Exception as e:
+        await _respond(writer, 400, '{0}: {1}'.format(type(e).__name__, e).encode('utf-8'))
+        return
+    await _respond(writer, 200, body, 'application/octet-stream' if binary else 'text/plain; charset=ascii')
+
+async def _serve(host, port, jobs, ready=None):
+    """Run the server until cancelled
+
+    Args:
+        host (str): Listening host
+        port (int): Listening port
+        jobs (int): Number of worker processes (None: number of CPUs)
+        ready: Function called with the bound address when the server accepts requests
+    """
+    import os
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = jobs if jobs else os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        #Start all workers before the first request
+        await asyncio.gather(*[loop.run_in_executor(pool, _warm) for i in range(jobs)])
+        server = await asyncio.start_server(lambda r, w: _handle(r, w, pool), host, port)
+        async with server:
+            if ready is not None:
+                ready(server.sockets[0].getsockname()[:2])
+            await server.serve_forever()
+
+def serve(address=None, jobs=None, ready=None):
+    """Run the conversion daemon until interrupted
+
+    Args:
+        address (str): Listening address as 'HOST:PORT' (None: default address)
+        jobs (int): Number of worker processes (None: number of CPUs)
+        ready: Function called with the bound address when the server accepts requests
+    """
+    import asyncio
+    host, port = parse_address(address)
+    asyncio.run(_serve(host, port, jobs, ready))
+
+def request(lctext, config, binary=False, address=None, timeout=60):
+    """Convert LovelyComposer jsonl text by the daemon
+
+    Args:
+        lctext (str): The whole content of LovelyComposer source file
+        config (dict): Keyword arguments for Basic.configure()
+        binary (bool): Return tokenized binary basic instead of ASCII text
+        address (str): Server address as 'HOST:PORT' (None: default address)
+        timeout (float): Timeout in seconds
+
+    Returns:
+        bytes: MSX basic file content
+
+    Raises:
+        OSError: The daemon is not reachable
+        ValueError: The daemon rejected the conversion
+    """
+    import json
+    import http.client
+    host, port = parse_address(address)
+    body = json.dumps({'lcjsonl': lctext, 'options': config, 'format': 'binary' if binary else 'ascii'})
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request('POST', '/convert', body.encode('utf-8'), {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        data = response.read()
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise ValueError(data.decode('utf-8', 'replace'))
+    return data
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""MSX playback timing analysis module
+
+    Parses MSX basic program line by line and computes the duration of each channel by the 'PLAY' statement
+    from 'T', 'L' and the length notations in interrupt ticks as MSX counts them.
+    The lines whose channels take different durations are flagged as desynchronized,
+    and the feeding of PSG queues by the interpreter is simulated to estimate the queue headroom.
+
+   Constraints:
+    * Each note takes int(TICKRATE * 240 / (tempo * length)) ticks, dots extend it before the truncation,
+      so that rests coupled into single length by hand may differ from the separate ones by the truncation.
+    * Queue entries take NOTEBYTES by the note and RESTBYTES by the rest out of QUEUESIZE by the channel.
+    * The interpreter reads each 'PLAY' statement at PARSERATE bytes per second before queueing it,
+      feeds the channels by turns note by note, and waits while the queue of the channel being fed is full.
+      These are estimates of MSX basic, and the headroom is an indicator rather than the exact margin.
+"""
+
+import re
+from collections import deque
+from typing import NamedTuple
+from .msxmml import MSXVALS
+from .reverse import Reader
+from .reverse import MSXLEN
+
+TICKRATE = 60
+QUEUESIZE = 128
+NOTEBYTES = 5
+RESTBYTES = 3
+PARSERATE = 1000
+HOTSPOTS = 10
+MSXTEMPO = 120
+
+_TIMING = re.compile(r'([A-G])[+#-]?(\d*)(\.*)|R(\d*)(\.*)|N(\d+)|([TL])(\d+)|[VOMS]\d*|[<>]|\s+')
+
+class LineTiming(NamedTuple):
+    """Timing of single 'PLAY' statement
+
+    Args:
+        row (int): Line number (None: not numbered)
+        ticks (tuple[int]): Duration by the channel in ticks
+        headroom (float): Seconds queued ahead minus the seconds to read the statement
+            (None: nothing queued at the beginning of the statement)
+        stall (float): Seconds the queue runs out while the statement is fed, the longest among channels
+        desync (bool): Channels with notes take different durations
+    """
+    row: int
+    ticks: tuple
+    headroom: float
+    stall: float
+    desync: bool
+
+class Analyzer(Reader):
+    """Streaming timing analyzer of single MSX basic program
+
+    Args:
+        lines (int): Number of 'PLAY' statements analyzed
+        notes (list[int]): Notes and rests by the channel
+        ticks (list[int]): Total duration by the channel in ticks
+        desyncs (int): Number of desynchronized statements
+        maxdrift (int): The largest difference of the total durations among channels with notes in ticks
+        driftrow (int): Line number where the largest difference is found
+        minheadroom (float): The smallest headroom in seconds (None: nothing queued ahead)
+        headroomrow (int): Line number of the smallest headroom
+        stalls (int): Number of statements whose queues run out
+        stalltime (float): Total seconds the queues run out
+        hotspots (list[LineTiming]): Flagged statements up to the limit
+    """
+    def __init__(self, tickrate=TICKRATE, queuesize=QUEUESIZE, parserate=PARSERATE, limit=HOTSPOTS):
+        """Initialization
+
+        Args:
+            tickrate (int): Interrupts per second, 60 for NTSC and 50 for PAL
+            queuesize (int): Queue bytes by the channel
+            parserate (float): Bytes of 'PLAY' arguments the interpreter reads per second
+            limit (int): Maximum number of hot spots kept
+        """
+        super().__init__()
+        self.tickrate = tickrate
+        self.queuesize = queuesize
+        self.parserate = parserate
+        self.limit = limit
+        channels = MSXVALS.CHANNELS.value
+        self.lines = 0
+        self.notes = [0] * channels
+        self.ticks = [0] * channels
+        self.desyncs = 0
+        self.maxdrift = 0
+        self.driftrow = None
+        self.minheadroom = None
+        self.headroomrow = None
+        self.stalls = 0
+        self.stalltime = 0.0
+        self.hotspots = []
+        self._tempos = [MSXTEMPO] * channels
+        self._lengths = [MSXLEN] * channels
+        self._durations = {}
+        self._now = 0.0
+        self._ends = [0.0] * channels
+        self._active = [False] * channels
+        self._queues = [deque() for c in range(channels)]
+        self._queued = [0] * channels
+
+    def _ticks(self, tempo, length, dots):
+        """Ticks of single note
+
+        Args:
+            tempo (int): Tempo
+            length (str): Length notation
+            dots (str): Dots of the length
+
+        Returns:
+            int: Number of ticks
+        """
+        key = (tempo, length, dots)
+        ticks = self._durations.get(key)
+        if ticks is None:
+            scale = 2 ** len(dots)
+            ticks = self._durations[key] = \
+                self.tickrate * 240 * (2 * scale - 1) // (tempo * int(length) * scale)
+        return ticks
+
+    def scan(self, channel, mml):
+        """Scan MML string of single channel into queue entries
+
+        Args:
+            channel (int): PSG channel number from 0
+            mml (str): MML string of 'PLAY' argument
+
+        Returns:
+            list[tuple]: Ticks and queue bytes by the note
+
+        Raises:
+            ValueError: The string contains unsupported notation
+        """
+        entries = []
+        tempo = self._tempos[channel]
+        length = self._lengths[channel]
+        pos = 0
+        mml = mml.upper()
+
+        for m in _TIMING.finditer(mml):
+            if m.start() != pos:
+                break
+            pos = m.end()
+            scale, scalelen, scaledots, restlen, restdots, number, macro, value = m.groups()
+            if scale is not None:
+                entries.append((self._ticks(tempo, scalelen if scalelen else length, scaledots), NOTEBYTES))
+            elif restdots is not None:
+                entries.append((self._ticks(tempo, restlen if restlen else length, restdots), RESTBYTES))
+            elif number is not None:
+                entries.append((self._ticks(tempo, length, ''), NOTEBYTES if int(number) > 0 else RESTBYTES))
+            elif macro == 'T':
+                tempo = int(value)
+            elif macro == 'L':
+                length = value
+        if pos != len(mml):
+            raise ValueError('Unsupported notation at \'{0}\''.format(mml[pos:]))
+
+        self._tempos[channel] = tempo
+        self._lengths[channel] = length
+        return entries
+
+    def _feed(self, channel, ticks, size):
+        """Simulate the interpreter queueing single note
+
+        Args:
+            channel (int): PSG channel number from 0
+            ticks (int): Duration of the note in ticks
+            size (int): Queue bytes of the note
+
+        Returns:
+            float: Seconds the queue has run out before the note
+        """
+        queue = self._queues[channel]
+        while queue and (queue[0][0] <= self._now or self._queued[channel] + size > self.queuesize):
+            end, popped = queue.popleft()
+            self._queued[channel] -= popped
+            self._now = max(self._now, end)
+        stall = 0.0
+        start = self._ends[channel]
+        if self._now > start:
+            if self._active[channel]:
+                stall = self._now - start
+            start = self._now
+        self._ends[channel] = start + ticks / self.tickrate
+        queue.append((self._ends[channel], size))
+        self._queued[channel] += size
+        self._active[channel] = True
+        return stall
+
+    def play(self, args):
+        """Analyze single 'PLAY' statement
+
+        Args:
+            args (list[str]): MML string by the channel
+        """
+        channels = MSXVALS.CHANNELS.value
+        entries = [self.scan(c, mml) for c, mml in enumerate(args[:channels])]
+        entries.extend([] for c in range(channels - len(entries)))
+        ticks = tuple(sum(t for t, size in notes) for notes in entries)
+
+        #Time queued ahead of the channels still playing, and the time to read the statement
+        ahead = [self._ends[c] - self._now for c in range(channels) if self._active[c]]
+        parse = sum(len(mml) for mml in args) / self.parserate
+        headroom = min(ahead) - parse if ahead else None
+        self._now += parse
+
+        #Channels are fed by turns note by note
+        stalls = [0.0] * channels
+        for i in range(max(len(notes) for notes in entries)):
+            for c, notes in enumerate(entries):
+                if i < len(notes):
+                    stalls[c] += self._feed(c, *notes[i])
+        stall = max(stalls)
+        for c, notes in enumerate(entries):
+            self._active[c] = bool(notes)
+            self.notes[c] += len(notes)
+            self.ticks[c] += ticks[c]
+
+        durations = set(t for t, notes in zip(ticks, entries) if notes)
+        desync = len(durations) > 1
+        totals = [t for t, n in zip(self.ticks, self.notes) if n]
+        drift = max(totals) - min(totals) if totals else 0
+
+        self.lines += 1
+        self.desyncs += desync
+        if drift > self.maxdrift:
+            self.maxdrift = drift
+            self.driftrow = self.row
+        if headroom is not None and (self.minheadroom is None or headroom < self.minheadroom):
+            self.minheadroom = headroom
+            self.headroomrow = self.row
+        if stall > 0:
+            self.stalls += 1
+            self.stalltime += stall
+        if (desync or stall > 0 or (headroom is not None and headroom < 0)) and len(self.hotspots) < self.limit:
+            self.hotspots.append(LineTiming(self.row, ticks, headroom, stall, desync))
+
+    def report(self):
+        """Human readable summary
+
+        Returns:
+            list[str]: Report lines
+        """
+        lines = ['lines {0}, notes {1}, duration {2} ticks ({3:.1f} s)'.format(self.lines, \
+            ' / '.join(str(n) for n in self.notes), \
+            ' / '.join(str(t) for t in self.ticks), \
+            max(self.ticks) / self.tickrate)]
+        lines.append('desynchronized lines {0}, max drift {1} ticks{2}'.format(self.desyncs, self.maxdrift, \
+            '' if self.driftrow is None else ' at line {0}'.format(self.driftrow)))
+        lines.append('queue headroom min {0}, stalls {1} ({2:.3f} s)'.format( \
+            '-' if self.minheadroom is None else '{0:+.3f} s at line {1}'.format(self.minheadroom, self.headroomrow), \
+            self.stalls, self.stalltime))
+        for spot in self.hotspots:
+            flags = []
+            if spot.desync:
+                flags.append('desync')
+            if spot.stall > 0:
+                flags.append('stall {0:.3f} s'.format(spot.stall))
+            if spot.headroom is not None and spot.headroom < 0:
+                flags.append('headroom {0:+.3f} s'.format(spot.headroom))
+            lines.append('  line {0}: ticks {1} {2}'.format(spot.row, \
+                ' / '.join(str(t) for t in spot.ticks), ', '.join(flags)))
+        return lines
+
+def analyze(lines, **params):
+    """Streaming timing analysis of MSX basic program
+
+    Args:
+        lines: Iterable of ASCII MSX basic lines
+        params: Keyword arguments for Analyzer
+
+    Returns:
+        Analyzer: Analyzer holding the result
+
+    Raises:
+        ValueError: The program contains unsupported notation
+    """
+    analyzer = Analyzer(**params)
+    for number, text in enumerate(lines, 1):
+        try:
+            analyzer.line(text)
+        except ValueError as e:
+            raise ValueError('Line {0}: {1}'.format(number, e)) from None
+    return analyzer
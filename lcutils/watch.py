@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""MSX mml watch conversion module
+
+    Polls the directory for LovelyComposer jsonl files and re-converts only the files
+    whose content hash has changed since the last conversion.
+    Each file keeps its own Basic instance with the bar cache, so that a saved song
+    re-converts only the bars whose note data changed.
+
+   Constraints:
+    * The directory is polled by the modification time and the size, and the content hash
+      is calculated only for the files whose stat has changed.
+"""
+
+import io
+import os
+import time
+import hashlib
+from .msxmml import Basic
+from .batch import BASEXT
+from .batch import collect
+
+DEFINTERVAL = 0.5
+
+class Watcher:
+    """Incremental converter of the watched directory
+    """
+    def __init__(self, directory, outdir, config, binary=False):
+        """Initialization
+
+        Args:
+            directory (str): The directory of LovelyComposer source files
+            outdir (str): The directory for target MSX basic files
+            config (dict): Keyword arguments for Basic.configure()
+            binary (bool): Write tokenized binary basic instead of ASCII text
+        """
+        self.directory = directory
+        self.outdir = outdir
+        self.config = config
+        self.binary = binary
+        self._stats = {}
+        self._hashes = {}
+        self._converters = {}
+
+    def _converter(self, lcfile):
+        """Basic instance with the bar cache dedicated to the file
+
+        Args:
+            lcfile (str): The path of LovelyComposer source file
+
+        Returns:
+            Basic: Configured Basic instance
+        """
+        mb = self._converters.get(lcfile)
+        if mb is None:
+            mb = Basic()
+            mb.configure(**self.config)
+            mb.barcache()
+            self._converters[lcfile] = mb
+        return mb
+
+    def convert(self, lcfile, lcdata):
+        """Convert single LovelyComposer file content
+
+        Args:
+            lcfile (str): The path of LovelyComposer source file
+            lcdata (bytes): The whole content of the file
+
+        Returns:
+            str: The path of written MSX basic file
+        """
+        name = os.path.splitext(os.path.basename(lcfile))[0] + BASEXT
+        basfile = os.path.join(self.outdir, name)
+        mb = self._converter(lcfile)
+        mb.loads(lcdata.decode('utf-8'))
+
+        if self.binary:
+            from .msxbas import write
+            buf = io.StringIO()
+            mb.write(buf)
+            with open(basfile, 'wb') as f_out:
+                write(f_out, buf.getvalue().splitlines(True))
+        else:
+            with open(basfile, 'w', encoding='ascii') as f_out:
+                mb.write(f_out)
+        return basfile
+
+    def poll(self):
+        """Convert the files changed since the last poll
+
+        Returns:
+            list[tuple]: lcfile, basfile, error message (None in case of success)
+                and elapsed seconds by the converted file
+        """
+        results = []
+        lcfiles = collect(self.directory)
+
+        #Forget removed files
+        for lcfile in set(self._stats) - set(lcfiles):
+            del self._stats[lcfile]
+            self._hashes.pop(lcfile, None)
+            self._converters.pop(lcfile, None)
+
+        for lcfile in lcfiles:
+            try:
+                st = os.stat(lcfile)
+            except OSError:
+                continue
+            stat = (st.st_mtime_ns, st.st_size)
+            if self._stats.get(lcfile) == stat:
+                continue
+            self._stats[lcfile] = stat
+
+            start = time.perf_counter()
+            try:
+                with open(lcfile, 'rb') as f:
+                    lcdata = f.read()
+                digest = hashlib.sha256(lcdata).digest()
+                if self._hashes.get(lcfile) == digest:
+                    continue
+                basfile = self.convert(lcfile, lcdata)
+                self._hashes[lcfile] = digest
+                error = None
+            except Exception as e:
+                basfile = None
+                error = '{0}: {1}'.format(type(e).__name__, e)
+            results.append((lcfile, basfile, error, time.perf_counter() - start))
+
+        return results
+
+    def run(self, interval=DEFINTERVAL, report=None):
+        """Poll the directory until interrupted
+
+        Args:
+            interval (float): Polling interval in seconds
+            report: Function called with each result of poll() (None: not reported)
+        """
+        os.makedirs(self.outdir, exist_ok=True)
+        while True:
+            for result in self.poll():
+                if report is not None:
+                    report(*result)
+            time.sleep(interval)